@@ -0,0 +1,168 @@
+"""Stuck and drifting temperature sensor detection for the Smart Thermostat."""
+import math
+
+STUCK_DURATION = 1800  # Seconds without a changed value before a sensor can be stuck
+STUCK_MOVEMENT = 0.8  # °C the other sensors must move meanwhile
+STUCK_EPSILON = 1e-6  # Values closer than this count as unchanged
+DRIFT_SMOOTHING = 0.05  # Weight of the newest residual in the recent offset
+DRIFT_THRESHOLD = 4.0  # Baseline standard deviations before a sensor is drifting
+DRIFT_MIN_OFFSET = 1.0  # °C; smaller departures from the baseline are never flagged
+DRIFT_MIN_SAMPLES = 30  # Residuals needed before drift is judged
+DRIFT_BASELINE_SAMPLES = 500  # Cap on the baseline count so it can still adapt slowly
+
+STUCK = "stuck"
+DRIFTING = "drifting"
+
+
+class _SensorStats:
+    """Running statistics for one sensor."""
+
+    __slots__ = ("count", "mean", "m2", "recent", "last_value", "flat_since", "flat_reference")
+
+    def __init__(self):
+        self.count = 0  # Welford baseline of the offset from the other sensors
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.recent = None  # Exponentially weighted recent offset
+        self.last_value = None
+        self.flat_since = None  # When the value last changed
+        self.flat_reference = None  # Reference temperature when the flat line began
+
+    def add_baseline(self, residual):
+        """Fold an offset into the Welford mean and variance."""
+        if self.count < DRIFT_BASELINE_SAMPLES:
+            self.count += 1
+        else:
+            self.m2 *= (self.count - 2) / (self.count - 1)  # Keep the variance as count stays
+        delta = residual - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (residual - self.mean)
+
+    @property
+    def std(self):
+        return math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+
+def _moved(stats, reference):
+    """Return True if the reference moved STUCK_MOVEMENT since the flat line began."""
+    return (
+        reference is not None
+        and stats.flat_reference is not None
+        and abs(reference - stats.flat_reference) >= STUCK_MOVEMENT
+    )
+
+
+class AnomalyDetector:
+    """Flag sensors that flat-line or drift away from the rest of the house.
+
+    Every report updates when the sensor's value last changed and its offset
+    from the reference temperature of the other sensors, in constant time. A
+    sensor is stuck when its value has not changed for STUCK_DURATION while the
+    reference moved by STUCK_MOVEMENT, and drifting when its recent offset has
+    left its long-run Welford baseline. Home Assistant doesn't report a value
+    that didn't change, so check_stuck() judges flat lines between reports.
+    Drift clears with hysteresis once the offset comes back; a stuck sensor
+    clears on its next changed value.
+    """
+
+    def __init__(self):
+        self._stats = {}  # sensor_id -> _SensorStats
+        self.flags = {}  # sensor_id -> STUCK or DRIFTING
+        self.version = 0
+
+    def check(self, sensor_id, value, reference, timestamp):
+        """Fold in a report and return the sensor's flag, or None if healthy.
+
+        reference is the temperature of the other sensors, or None when there
+        are too few of them to judge against.
+        """
+        stats = self._stats.get(sensor_id)
+        if stats is None:
+            stats = self._stats[sensor_id] = _SensorStats()
+
+        if stats.last_value is None or abs(value - stats.last_value) >= STUCK_EPSILON:
+            stats.flat_since = timestamp
+            stats.flat_reference = reference
+        stats.last_value = value
+        if stats.flat_reference is None:
+            stats.flat_reference = reference
+
+        flat = timestamp - stats.flat_since >= STUCK_DURATION
+        previous = self.flags.get(sensor_id)
+        flag = None
+        if flat and (previous == STUCK or _moved(stats, reference)):
+            flag = STUCK
+        elif reference is not None and not flat:
+            flag = self._check_drift(stats, value - reference, previous)
+        elif previous == DRIFTING:
+            flag = DRIFTING  # No evidence either way; keep the flag
+        return self._set_flag(sensor_id, flag)
+
+    def flat_lines(self):
+        """Return the sensors holding a value that aren't flagged stuck yet."""
+        return [
+            sensor_id for sensor_id, stats in self._stats.items()
+            if stats.flat_since is not None and self.flags.get(sensor_id) != STUCK
+        ]
+
+    def check_stuck(self, sensor_id, reference, now):
+        """Flag a sensor that has gone quiet on one value while the others moved.
+
+        Returns True if the sensor was newly flagged as stuck.
+        """
+        stats = self._stats.get(sensor_id)
+        if stats is None or stats.flat_since is None or self.flags.get(sensor_id) == STUCK:
+            return False
+        if stats.flat_reference is None:
+            stats.flat_reference = reference
+            return False
+        if now - stats.flat_since < STUCK_DURATION or not _moved(stats, reference):
+            return False
+        self._set_flag(sensor_id, STUCK)
+        return True
+
+    def _set_flag(self, sensor_id, flag):
+        """Record a sensor's flag and return it."""
+        if flag != self.flags.get(sensor_id):
+            if flag is None:
+                del self.flags[sensor_id]
+            else:
+                self.flags[sensor_id] = flag
+            self.version += 1
+        return flag
+
+    def _check_drift(self, stats, residual, flag):
+        """Update the offset statistics and return DRIFTING or None."""
+        if stats.recent is None:
+            stats.recent = residual
+        else:
+            stats.recent += DRIFT_SMOOTHING * (residual - stats.recent)
+
+        if stats.count < DRIFT_MIN_SAMPLES:
+            stats.add_baseline(residual)
+            return None
+
+        limit = max(DRIFT_THRESHOLD * stats.std, DRIFT_MIN_OFFSET)
+        departure = abs(stats.recent - stats.mean)
+        if departure > limit or (flag == DRIFTING and departure > limit / 2):
+            return DRIFTING
+        # Only learn the baseline from offsets close to it so drift isn't absorbed
+        if abs(residual - stats.mean) <= limit / 2:
+            stats.add_baseline(residual)
+        return None
+
+    def reset(self, sensor_id, keep_flat=False):
+        """Forget a sensor's flag and flat line, keeping its offset baseline.
+
+        keep_flat keeps the flat line and a stuck flag, for a sensor that only
+        went quiet and may come back on the same value.
+        """
+        stats = self._stats.get(sensor_id)
+        if stats is not None:
+            if not keep_flat:
+                stats.last_value = None
+                stats.flat_since = None
+                stats.flat_reference = None
+            stats.recent = None
+        if not (keep_flat and self.flags.get(sensor_id) == STUCK):
+            self._set_flag(sensor_id, None)
@@ -12,21 +12,71 @@ from homeassistant.const import (
 from homeassistant.core import HomeAssistant
 from homeassistant.helpers.typing import ConfigType
 import logging
+import time
+from types import MappingProxyType
 from datetime import datetime, timezone, timedelta
-from collections import deque
 import asyncio
-from homeassistant.helpers.event import async_track_state_change_event
+from functools import partial
+from homeassistant.helpers.event import (
+    async_call_later,
+    async_track_point_in_utc_time,
+)
 from homeassistant.core import callback
-import voluptuous as vol
-import homeassistant.helpers.config_validation as cv
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util, slugify
+
+from .commands import COMMAND_TIMEOUT, CommandDispatcher, Reconciler
+from .const import DOMAIN
+from .durations import DURATION_BUCKET_SIZE, TIME_OF_DAY_BUCKETS, DurationTable
+from .economics import (
+    DEFAULT_COP_CURVE,
+    ELECTRICITY_PRICE,
+    FURNACE_EFFICIENCY,
+    GAS_PRICE,
+    EnergyEconomics,
+    parse_cop_curve,
+)
+from .heat_pumps import parse_heat_pumps
+from .history import ActionHistory
+from .hub import async_get_sensor_hub
+from .outdoor import OUTDOOR_REPLACE, async_get_outdoor_conditions
+from .planner import HEAT_LOSS, PLAN_HORIZON, HeatSourcePlanner
+from .scheduler import CONTROL_DEBOUNCE, ControlScheduler, async_get_updater
+from .sensors import SENSOR_FRESHNESS, SensorAggregator
+from .services import async_get_router
+from .thermal import DeadReckoning, ThermalEstimator
 
 _LOGGER = logging.getLogger(__name__)
 
-DOMAIN = "smart_thermostat"
 DEFAULT_NAME = "Smart Thermostat"
 
 # System variables for timing
-COMMAND_DELAY_MS = 100  # 100 milliseconds delay between commands
+COMMAND_DELAY_MS = 100  # 100 milliseconds delay between commands to the same device
+COMMAND_SETTLE_TIME = 90  # Seconds a sent command has to show up in the device state
+# Cycle transitions fire on their own timers and sensors push updates, so the
+# periodic update is only a safety net for devices that drifted from their
+# desired state. It is the default scan_interval.
+SCAN_INTERVAL = timedelta(minutes=2)
+
+# Persisted learning and cycle state
+STORAGE_VERSION = 1
+STORAGE_SAVE_DELAY = 10  # Seconds to coalesce state changes into one write
+
+ATTRIBUTES_MAX_AGE = 60  # Seconds before time-dependent attributes are rebuilt anyway
+
+def _isoformat(value):
+    """Return a datetime as an ISO string for storage."""
+    return value.isoformat() if value else None
+
+
+def _parse_datetime(value):
+    """Return a stored ISO string as a datetime, or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return None
 
 async def async_setup_platform(hass: HomeAssistant, config: ConfigType, async_add_entities, discovery_info=None):
     """Set up the smart thermostat platform."""
@@ -34,6 +84,9 @@ async def async_setup_platform(hass: HomeAssistant, config: ConfigType, async_ad
     temp_sensors = config.get("temperature_sensors", [])
     hvac_entity = config.get("hvac_entity")
     heat_pump_entity = config.get("heat_pump_entity")
+    # Heat pumps, each heating a zone and sent commands through its controller
+    # (e.g. an IR blaster); replaces heat_pump_entity when given
+    heat_pumps = parse_heat_pumps(config.get("heat_pumps") or heat_pump_entity)
     min_temp = config.get("min_temp", 16)
     max_temp = config.get("max_temp", 25)
     target_temp = config.get("target_temp", 20)
@@ -43,48 +96,63 @@ async def async_setup_platform(hass: HomeAssistant, config: ConfigType, async_ad
     off_time = config.get("off_time", 20) * 60
     heat_pump_min_temp = config.get("heat_pump_min_temp", -5)
     heat_pump_max_temp = config.get("heat_pump_max_temp", -3)
+    # Energy prices and heat pump COP curve used to pick the cheaper source
+    economics = EnergyEconomics(
+        parse_cop_curve(config.get("cop_curve", DEFAULT_COP_CURVE)),
+        config.get("electricity_price", ELECTRICITY_PRICE),
+        config.get("gas_price", GAS_PRICE),
+        config.get("furnace_efficiency", FURNACE_EFFICIENCY),
+    )
+    heat_loss = config.get("heat_loss", HEAT_LOSS)
     weather_entity = config.get("weather_entity", "weather.forecast_home")
+    # Minutes before a sensor reading is stale, either for all sensors or per sensor
+    sensor_freshness = config.get("sensor_freshness", 5)
+    if isinstance(sensor_freshness, dict):
+        sensor_freshness = {
+            sensor_id: minutes * 60 for sensor_id, minutes in sensor_freshness.items()
+        }
+    else:
+        sensor_freshness = sensor_freshness * 60
+    # Relative weight of each sensor in the fused temperature (1 by default)
+    sensor_weights = config.get("sensor_weights", {})
+    # Seconds to wait for a device to confirm a command, for all devices or per device
+    command_timeout = config.get("command_timeout", COMMAND_TIMEOUT)
+    # Seconds to collect sensor updates into one control pass
+    control_debounce = config.get("control_debounce", CONTROL_DEBOUNCE)
+    # Learned durations are kept per outdoor temperature (and time of day) bucket
+    duration_bucket_size = config.get("duration_bucket_size", DURATION_BUCKET_SIZE)
+    time_of_day_buckets = config.get("time_of_day_buckets", TIME_OF_DAY_BUCKETS)
+    # Local outdoor sensors replace or are averaged with the weather observation
+    outdoor_sensors = config.get("outdoor_sensors", [])
+    outdoor_sensor_mode = config.get("outdoor_sensor_mode", OUTDOOR_REPLACE)
+    # Periodic safety-net update, as a timedelta from the platform schema or seconds
+    scan_interval = config.get("scan_interval", SCAN_INTERVAL)
+    if not isinstance(scan_interval, timedelta):
+        scan_interval = timedelta(seconds=scan_interval)
 
     thermostat = SmartThermostat(
         hass, name, temp_sensors, hvac_entity, heat_pump_entity,
         min_temp, max_temp, target_temp, tolerance,
         minimum_on_time, maximum_on_time, off_time,
-        heat_pump_min_temp, heat_pump_max_temp, weather_entity
-    )
-    
-    # Store the thermostat instance in hass.data
-    if DOMAIN not in hass.data:
-        hass.data[DOMAIN] = {}
-    hass.data[DOMAIN][name] = thermostat
-    
-    # Register custom services
-    async def handle_turn_on(call):
-        """Handle the custom turn_on service."""
-        entity_id = call.data.get('entity_id')
-        if entity_id and entity_id == thermostat.entity_id:
-            await thermostat.async_turn_on()
-
-    async def handle_turn_off(call):
-        """Handle the custom turn_off service."""
-        entity_id = call.data.get('entity_id')
-        if entity_id and entity_id == thermostat.entity_id:
-            await thermostat.async_turn_off()
-
-    # Register the services
-    hass.services.async_register(
-        DOMAIN, 'turn_on', handle_turn_on,
-        schema=vol.Schema({
-            vol.Required('entity_id'): cv.entity_id
-        })
-    )
-    
-    hass.services.async_register(
-        DOMAIN, 'turn_off', handle_turn_off,
-        schema=vol.Schema({
-            vol.Required('entity_id'): cv.entity_id
-        })
+        heat_pump_min_temp, heat_pump_max_temp, weather_entity,
+        sensor_freshness=sensor_freshness,
+        command_timeout=command_timeout,
+        control_debounce=control_debounce,
+        duration_bucket_size=duration_bucket_size,
+        time_of_day_buckets=time_of_day_buckets,
+        economics=economics,
+        heat_loss=heat_loss,
+        sensor_weights=sensor_weights,
+        scan_interval=scan_interval,
+        outdoor_sensors=outdoor_sensors,
+        outdoor_sensor_mode=outdoor_sensor_mode,
+        heat_pumps=heat_pumps
     )
     
+    # Services are registered once and routed by entity_id; each thermostat
+    # indexes itself when added
+    async_get_router(hass)
+
     async_add_entities([thermostat])
 
 class SmartThermostat(ClimateEntity):
@@ -93,16 +161,30 @@ class SmartThermostat(ClimateEntity):
     def __init__(self, hass, name, temp_sensors, hvac_entity, heat_pump_entity,
                  min_temp, max_temp, target_temp, tolerance,
                  minimum_on_time, maximum_on_time, off_time,
-                 heat_pump_min_temp, heat_pump_max_temp, weather_entity):
+                 heat_pump_min_temp, heat_pump_max_temp, weather_entity,
+                 sensor_freshness=SENSOR_FRESHNESS, command_timeout=COMMAND_TIMEOUT,
+                 control_debounce=CONTROL_DEBOUNCE, duration_bucket_size=DURATION_BUCKET_SIZE,
+                 time_of_day_buckets=TIME_OF_DAY_BUCKETS, economics=None, heat_loss=HEAT_LOSS,
+                 sensor_weights=None, scan_interval=SCAN_INTERVAL, outdoor_sensors=None,
+                 outdoor_sensor_mode=OUTDOOR_REPLACE, heat_pumps=None):
         """Initialize the thermostat."""
+        heat_pumps = heat_pumps or parse_heat_pumps(heat_pump_entity)
         # Validate required entities
-        if not hvac_entity or not heat_pump_entity:
-            raise ValueError("Both hvac_entity (furnace) and heat_pump_entity must be defined")
+        if not hvac_entity or not heat_pumps:
+            raise ValueError(
+                "Both hvac_entity (furnace) and heat_pump_entity (or heat_pumps) must be defined"
+            )
+        # Zone sensors also count towards the house temperature
+        temp_sensors = list(temp_sensors) + [
+            sensor_id for heat_pump in heat_pumps for sensor_id in heat_pump.sensors
+            if sensor_id not in temp_sensors
+        ]
             
         self._hass = hass
         self._name = name
         self._hvac_entity = hvac_entity
-        self._heat_pump_entity = heat_pump_entity
+        self._heat_pumps = heat_pumps
+        self._heat_pump_entity = heat_pumps[0].entity_id  # Primary heat pump
         self._min_temp = min_temp
         self._max_temp = max_temp
         self._target_temperature = target_temp
@@ -115,14 +197,21 @@ class SmartThermostat(ClimateEntity):
         self._hvac_action = HVACAction.OFF
         self._is_heating = False
         
-        # Command tracking
-        self._last_command_time = None
+        # Command tracking: desired state per device, reconciled through one lane
+        # per controller so heat pumps on different IR blasters send in parallel
         self._command_delay = COMMAND_DELAY_MS / 1000  # Convert to seconds
-        self._heat_pump_last_mode = None
-        self._heat_pump_last_temp = None
-        self._heat_pump_last_fan = None
-        self._furnace_last_mode = None
-        self._furnace_last_temp = None
+        self._commands = CommandDispatcher(
+            hass, self._command_delay, command_timeout,
+            controllers={heat_pump.entity_id: heat_pump.controller for heat_pump in heat_pumps}
+        )
+        self._reconciler = Reconciler(hass, self._commands, COMMAND_SETTLE_TIME)
+
+        # Control passes run one at a time; triggers during a pass coalesce
+        self._scheduler = ControlScheduler(hass, self._async_control_pass, control_debounce)
+        # Periodic updates come from the shared, staggered updater instead of
+        # Home Assistant's polling
+        self._scan_interval = scan_interval
+        self._attr_should_poll = False
         
         # Add supported features
         self._attr_supported_features = (
@@ -135,76 +224,316 @@ class SmartThermostat(ClimateEntity):
         self._attr_temperature_unit = UnitOfTemperature.CELSIUS
         
         # Initialize action history
-        self._action_history = deque(maxlen=50)  # Keep last 50 actions
+        self._action_history = ActionHistory()
         self._last_update = datetime.now()
-        self._sensor_temperatures = {}
         
-        # Initialize temperature tracking
+        # Initialize temperature tracking, fed by sensor state change events
         self._current_temperature = None
-        self._sensor_temperatures = {}
+        self._sensors = SensorAggregator(temp_sensors, sensor_freshness, sensor_weights)
+        self._sensor_temperatures = self._sensors.readings
+        self._sensor_expiry_deadline = None
+        self._sensor_expiry_unsub = None
         
         # Initialize cycle tracking
         self._heating_start_time = None
         self._cooling_start_time = None
         self._learning_heating_duration = minimum_on_time  # Default heating duration
+        # Learned durations per outdoor temperature bucket; the scalar above is
+        # the duration of the current cycle and the fallback for empty buckets
+        self._duration_table = DurationTable(duration_bucket_size, time_of_day_buckets)
+        self._duration_bucket = None  # Bucket the current cycle learns into
         self._minimum_heating_duration = minimum_on_time
         self._maximum_heating_duration = maximum_on_time
         self._off_time = off_time
         self._cycle_status = "waiting to activate"
-        self._time_remaining = 0
+        self._cycle_deadline = None  # When the current heating or cooling period ends
+        self._cycle_timer_unsub = None  # Fires a control pass at _cycle_deadline
+        # Operating limit of the heat pump; heat_pump_max_temp is still accepted
+        # but the source above the limit is chosen on cost
         self._outdoor_temp_furnace_threshold = heat_pump_min_temp
-        self._outdoor_temp_heat_pump_threshold = heat_pump_max_temp
         self._active_heat_source = None
+        self._last_switch_ms = None  # Duration of the last heat source switch
         self._last_forecast_check = None
+        self._outdoor_temperature = None  # Last outdoor reading
+        # Current outdoor temperature and hourly forecast, shared with every
+        # thermostat on the same weather entity and outdoor sensors
+        self._outdoor = async_get_outdoor_conditions(
+            hass, weather_entity, outdoor_sensors or (), outdoor_sensor_mode
+        )
+
+        # Thermal model per heat source, learned from the indoor temperature stream
+        self._thermal = ThermalEstimator()
+        # Projects the temperature forward through short sensor outages
+        self._dead_reckoning = DeadReckoning()
+        self._temperature_confidence = None  # 1 from sensors, falling while estimated
+
+        # Cheapest heat source schedule over the forecast, redone as it updates
+        self._economics = economics or EnergyEconomics()
+        self._planner = HeatSourcePlanner(self._economics, heat_loss=heat_loss)
+        self._plan = None
+        self._planned_outdoor_version = 0
+        self._pending_heat_source = None
         self._system_enabled = False  # New state variable for system operational status
         
         # Add force mode tracking
         self._force_mode = None
 
-    def _add_action(self, action: str):
-        """Add an action to the history and log it."""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        message = f"[{timestamp}] {action}"
-        self._action_history.appendleft(message)
-        
-        # Add more detailed logging
-        # _LOGGER.debug(
-        #     "Smart Thermostat Action - Name: %s, Action: %s, Current Temp: %.1f, "
-        #     "Target: %.1f, Mode: %s, Status: %s",
-        #     self._name,
-        #     action,
-        #     self._current_temperature if self._current_temperature is not None else -999,
-        #     self._target_temperature,
-        #     self._hvac_mode,
-        #     self._cycle_status
-        # )
-        
-    def _is_sensor_fresh(self, sensor_id: str) -> bool:
-        """Check if sensor data is fresh (within last 5 minutes)."""
-        state = self._hass.states.get(sensor_id)
-        if not state:
-            self._add_action(f"Sensor {sensor_id} not found")
-            # Remove from sensor_temperatures if not found
-            self._sensor_temperatures.pop(sensor_id, None)
-            return False
-            
-        try:
-            last_updated = state.last_updated
-            if isinstance(last_updated, str):
-                last_updated = datetime.strptime(last_updated, "%Y-%m-%dT%H:%M:%S.%f%z")
-            
-            now = datetime.now(timezone.utc)
-            time_diff = (now - last_updated).total_seconds()
-            
-            if time_diff > 300:  # 5 minutes
-                # Remove stale data from sensor_temperatures
-                self._sensor_temperatures.pop(sensor_id, None)
-                return False
+        # Learned duration and cycle state survive restarts; writes are coalesced
+        self._store = Store(hass, STORAGE_VERSION, f"{DOMAIN}.{slugify(name)}")
+
+        # Cached extra_state_attributes snapshot and the version it was built for
+        self._attributes = None
+        self._attributes_version = None
+
+    def _add_action(self, action: str, *args, level=logging.INFO):
+        """Record an action in the history; formatting is deferred until read."""
+        self._action_history.add(action, args, level)
+        if _LOGGER.isEnabledFor(logging.DEBUG):
+            _LOGGER.debug("%s: " + action, self._name, *args)
+
+    @callback
+    def _async_update_sensor(self, sensor_id, state, value):
+        """Feed a sensor state, already parsed by the hub, into the reading cache."""
+        if value is None:
+            self._add_action("Invalid state from %s: %s", sensor_id, state.state if state else "No state", level=logging.WARNING)
+            self._sensors.remove(sensor_id)
+        else:
+            flag = self._sensors.flags.get(sensor_id)
+            self._sensors.update(sensor_id, value, state.last_updated.timestamp())
+            new_flag = self._sensors.flags.get(sensor_id)
+            if new_flag != flag:
+                if new_flag:
+                    self._add_action("Sensor %s looks %s - excluded from temperature", sensor_id, new_flag, level=logging.WARNING)
+                else:
+                    self._add_action("Sensor %s recovered - included in temperature", sensor_id)
+
+        if not len(self._sensors):
+            self._add_action("No fresh temperature data available")
+        self._update_current_temperature(state.last_updated.timestamp() if state else time.time())
+        self._async_schedule_sensor_expiry()
+
+        if value is not None:
+            self._thermal.add_sample(
+                state.last_updated.timestamp(), self._sensors.temperature,
+                self._read_outdoor_temperature(), self._active_heat_source, self._heat_delivered()
+            )
+
+    def _heat_delivered(self):
+        """Return whether the active source is delivering heat, or None if unknown.
+
+        The furnace burns exactly while a cycle is on. A heat pump in heat mode
+        may only be holding its setpoint, so its own hvac_action decides.
+        """
+        if self._active_heat_source != "heat_pump" or not self._is_heating:
+            return self._is_heating
+        actions = []
+        for heat_pump in self._heat_pumps:
+            state = self._hass.states.get(heat_pump.entity_id)
+            actions.append(state.attributes.get("hvac_action") if state else None)
+        if HVACAction.HEATING in actions:
             return True
-        except Exception as e:
-            self._add_action(f"Error checking freshness for {sensor_id}: {str(e)}")
-            self._sensor_temperatures.pop(sensor_id, None)
+        if all(action in (HVACAction.IDLE, HVACAction.OFF) for action in actions):
             return False
+        return None
+
+    def _update_current_temperature(self, now, fused=None):
+        """Set the control temperature from the sensors, or estimate it without them."""
+        if fused is None:
+            fused = self._sensors.temperature
+        if fused is not None:
+            self._dead_reckoning.observe(now, fused, self._heat_delivered())
+            self._current_temperature = fused
+            self._temperature_confidence = 1.0
+            return
+
+        was_estimated = self._temperature_confidence is not None and self._temperature_confidence < 1.0
+        estimate = self._dead_reckoning.advance(
+            now,
+            self._thermal.models.get(self._active_heat_source),
+            self._outdoor_temperature,
+            self._heat_delivered(),
+            ceiling=self._target_temperature + self._tolerance,
+        )
+        if estimate is None:
+            if self._current_temperature is not None:
+                self._add_action("No temperature estimate left - holding heating", level=logging.WARNING)
+            self._current_temperature = None
+            self._temperature_confidence = None
+            return
+        if not was_estimated:
+            self._add_action("No fresh sensors - estimating temperature from %.1f°C", estimate[0])
+        self._current_temperature, self._temperature_confidence = estimate
+
+    def _read_outdoor_temperature(self):
+        """Return the current outdoor temperature, if any."""
+        outdoor_temp = self._outdoor.temperature_at(time.time())
+        if outdoor_temp is not None:
+            self._outdoor_temperature = outdoor_temp
+        return self._outdoor_temperature
+
+    @callback
+    def _async_schedule_sensor_expiry(self):
+        """Arm a single timer for the earliest sensor staleness deadline."""
+        deadline = self._sensors.next_deadline()
+        if deadline == self._sensor_expiry_deadline:
+            return
+        self._async_cancel_sensor_expiry()
+        if deadline is None:
+            return
+        self._sensor_expiry_deadline = deadline
+        self._sensor_expiry_unsub = async_track_point_in_utc_time(
+            self._hass, self._async_sensor_expired, dt_util.utc_from_timestamp(deadline)
+        )
+
+    @callback
+    def _async_cancel_sensor_expiry(self):
+        """Cancel the pending sensor staleness timer."""
+        if self._sensor_expiry_unsub:
+            self._sensor_expiry_unsub()
+        self._sensor_expiry_unsub = None
+        self._sensor_expiry_deadline = None
+
+    @callback
+    def _async_sensor_expired(self, now):
+        """Evict readings that went stale and publish the new average once."""
+        self._sensor_expiry_unsub = None
+        self._sensor_expiry_deadline = None
+        stale = self._sensors.expire(now.timestamp())
+        for sensor_id in stale:
+            self._add_action("Sensor %s is stale - dropped from average", sensor_id)
+        if stale and not len(self._sensors):
+            self._add_action("No fresh temperature data available")
+        self._update_current_temperature(now.timestamp())
+        self._async_schedule_sensor_expiry()
+        if stale:
+            self.async_write_ha_state()
+
+    @callback
+    def _set_cycle_deadline(self, deadline):
+        """Set when the current cycle period ends and arm a timer for it."""
+        self._cycle_deadline = deadline
+        self._async_cancel_cycle_timer()
+        if deadline is not None:
+            self._async_arm_cycle_timer()
+        self._async_schedule_save()
+
+    @callback
+    def _async_arm_cycle_timer(self):
+        """Arm the cycle timer for the time left until the deadline."""
+        delay = max(0, (self._cycle_deadline - datetime.now()).total_seconds())
+        self._cycle_timer_unsub = async_call_later(
+            self._hass, delay, self._async_cycle_deadline_reached
+        )
+
+    @callback
+    def _async_cancel_cycle_timer(self):
+        """Cancel the pending cycle timer."""
+        if self._cycle_timer_unsub:
+            self._cycle_timer_unsub()
+        self._cycle_timer_unsub = None
+
+    @callback
+    def _async_cycle_deadline_reached(self, _now):
+        """Run a control pass as soon as the heating or off period ends."""
+        self._cycle_timer_unsub = None
+        if self._cycle_deadline is None:
+            return
+        if datetime.now() < self._cycle_deadline:
+            # The loop clock ran ahead of the wall clock; wait for the rest
+            self._async_arm_cycle_timer()
+            return
+        self._scheduler.async_request_now()
+
+    @callback
+    def _async_schedule_save(self):
+        """Persist the cycle state once changes settle."""
+        self._store.async_delay_save(self._state_to_store, STORAGE_SAVE_DELAY)
+
+    @callback
+    def _state_to_store(self):
+        """Return the learning and cycle state to persist."""
+        return {
+            "learning_heating_duration": self._learning_heating_duration,
+            "heating_start_time": _isoformat(self._heating_start_time),
+            "cooling_start_time": _isoformat(self._cooling_start_time),
+            "active_heat_source": self._active_heat_source,
+            "force_mode": self._force_mode,
+            "system_enabled": self._system_enabled,
+            "hvac_mode": self._hvac_mode,
+            "target_temperature": self._target_temperature,
+            "thermal_model": self._thermal.as_dict(),
+            "duration_table": self._duration_table.as_list(),
+            "duration_bucket": self._duration_bucket,
+        }
+
+    async def _async_restore_state(self):
+        """Resume the learned duration and any cycle in progress.
+
+        Nothing is sent to the devices here: the desired state is seeded so the
+        reconciler only acts if a device drifted while Home Assistant was down.
+        """
+        data = await self._store.async_load()
+        if not data:
+            return
+
+        duration = data.get("learning_heating_duration")
+        if duration is not None:
+            self._learning_heating_duration = min(
+                max(duration, self._minimum_heating_duration), self._maximum_heating_duration
+            )
+        self._target_temperature = data.get("target_temperature", self._target_temperature)
+        self._thermal.load(data.get("thermal_model"))
+        if self._duration_table.load(data.get("duration_table")):
+            self._duration_bucket = data.get("duration_bucket")
+        self._force_mode = data.get("force_mode")
+        self._active_heat_source = data.get("active_heat_source")
+        if not data.get("system_enabled"):
+            self._add_action(
+                "Restored learned duration %.1fmin", self._learning_heating_duration / 60
+            )
+            return
+
+        self._system_enabled = True
+        # Stores from before hvac_mode was persisted were only enabled while heating
+        if data.get("hvac_mode", HVACMode.HEAT) != HVACMode.HEAT:
+            # Left under manual control: nothing to resume or drive
+            self._hvac_mode = HVACMode.OFF
+            self._cycle_status = "off"
+            self._add_action(
+                "Restored manual control, learned duration %.1fmin",
+                self._learning_heating_duration / 60
+            )
+            return
+        self._hvac_mode = HVACMode.HEAT
+        heating_start = _parse_datetime(data.get("heating_start_time"))
+        cooling_start = _parse_datetime(data.get("cooling_start_time"))
+        if self._active_heat_source == "furnace" and heating_start:
+            self._is_heating = True
+            self._hvac_action = HVACAction.HEATING
+            self._heating_start_time = heating_start
+            self._cycle_status = "heating cycle: resumed"
+            desired = self._reconciler.desired(self._hvac_entity)
+            desired.hvac_mode = 'heat'
+            desired.temperature = self._max_temp
+            # An overdue deadline fires right away and ends the cycle
+            self._set_cycle_deadline(
+                heating_start + timedelta(seconds=self._learning_heating_duration)
+            )
+        elif self._active_heat_source == "furnace" and cooling_start:
+            self._cooling_start_time = cooling_start
+            self._cycle_status = "cooling cycle: resumed"
+            self._reconciler.desired(self._hvac_entity).hvac_mode = 'off'
+            self._set_cycle_deadline(cooling_start + timedelta(seconds=self._off_time))
+        elif self._active_heat_source == "heat_pump":
+            self._is_heating = True
+            self._hvac_action = HVACAction.HEATING
+            for heat_pump in self._heat_pumps:
+                self._reconciler.desired(heat_pump.entity_id).hvac_mode = 'heat'
+
+        self._add_action(
+            "Restored %s state (%s), learned duration %.1fmin",
+            self._active_heat_source, self._cycle_status, self._learning_heating_duration / 60
+        )
 
     @property
     def name(self):
@@ -218,37 +547,9 @@ class SmartThermostat(ClimateEntity):
 
     @property
     def current_temperature(self):
-        """Return the average current temperature from fresh sensors only."""
-        fresh_temperatures = {}  # Use dictionary to track both temp and source
-        
-        for sensor_id in self._temp_sensors:
-            try:
-                if not self._is_sensor_fresh(sensor_id):
-                    continue
-                    
-                state = self._hass.states.get(sensor_id)
-                if state and state.state not in ('unknown', 'unavailable'):
-                    try:
-                        temp = float(state.state)
-                        fresh_temperatures[sensor_id] = temp
-                    except ValueError:
-                        self._add_action(f"Invalid temperature value from {sensor_id}: {state.state}")
-                        continue
-                else:
-                    self._add_action(f"Invalid state from {sensor_id}: {state.state if state else 'No state'}")
-            except Exception as e:
-                self._add_action(f"Unexpected error with {sensor_id}: {str(e)}")
-                continue
-
-        if fresh_temperatures:
-            # Update the sensor_temperatures dictionary
-            self._sensor_temperatures = fresh_temperatures.copy()
-            avg_temp = sum(fresh_temperatures.values()) / len(fresh_temperatures)
-            self._current_temperature = avg_temp
-            return avg_temp
-        else:
-            self._add_action("No fresh temperature data available")
-            return None  # Return None instead of self._current_temperature when no data is available
+        """Return the fused temperature of the fresh sensors, or its estimate."""
+        # Stale readings are evicted by the expiry timer, so this is a plain read
+        return self._current_temperature
 
     @property
     def target_temperature(self):
@@ -292,47 +593,130 @@ class SmartThermostat(ClimateEntity):
 
     @property
     def extra_state_attributes(self):
-        """Return entity specific state attributes."""
-        now = datetime.now()
-        
-        # Calculate time remaining in current cycle
+        """Return entity specific state attributes.
+
+        The attributes are rebuilt only when something they report has changed,
+        or at least every ATTRIBUTES_MAX_AGE for the fields that age on their
+        own; otherwise the cached read-only snapshot is returned.
+        """
+        now = time.time()
         if self._heating_start_time and self._is_heating:
-            elapsed = (now - self._heating_start_time).total_seconds()
-            self._time_remaining = max(0, self._learning_heating_duration - elapsed)
             cycle_type = "heating"
         elif self._cooling_start_time and not self._is_heating:
-            elapsed = (now - self._cooling_start_time).total_seconds()
-            self._time_remaining = max(0, self._off_time - elapsed)
             cycle_type = "cooling"
         else:
-            self._time_remaining = 0
             cycle_type = "idle"
 
-        attributes = {
-            "action_history": list(self._action_history),
-            "sensor_temperatures": self._sensor_temperatures,
+        # Time remaining in current cycle, from the stored deadline
+        time_remaining = 0
+        if cycle_type != "idle" and self._cycle_deadline:
+            remaining = (self._cycle_deadline - datetime.now()).total_seconds()
+            time_remaining = round(max(0, remaining) / 60, 1)
+
+        # Cost per kWh delivered at the current outdoor temperature
+        heat_pump_cost = None
+        if self._outdoor_temperature is not None:
+            heat_pump_cost = round(self._economics.heat_pump_cost(self._outdoor_temperature), 4)
+        break_even = self._economics.break_even
+        if break_even is not None:
+            break_even = round(break_even, 1)
+
+        confidence = self._temperature_confidence
+        if confidence is not None:
+            confidence = round(confidence, 2)
+        estimate_valid_until = None
+        if confidence is not None and confidence < 1:
+            estimate_valid_until = dt_util.as_local(
+                dt_util.utc_from_timestamp(self._dead_reckoning.valid_until)
+            ).strftime("%H:%M:%S")
+
+        version = (
+            self._action_history.version,
+            self._sensors.version,
+            confidence,
+            cycle_type,
+            time_remaining,
+            self._cycle_status,
+            self._learning_heating_duration,
+            self._off_time,
+            self._force_mode,
+            self._commands.version,
+            self._last_switch_ms,
+            self._thermal.version,
+            self._duration_table.version,
+            self._plan,
+            heat_pump_cost,
+            # Sensor confidence decays and last_update ticks without new readings
+            int(now // ATTRIBUTES_MAX_AGE),
+        )
+        if version == self._attributes_version:
+            return self._attributes
+
+        self._attributes_version = version
+        self._attributes = MappingProxyType({
+            "action_history": self._action_history.entries(),
+            "sensor_temperatures": dict(self._sensor_temperatures),
             "average_temperature": self._current_temperature,
+            "temperature_confidence": confidence,
+            "estimate_valid_until": estimate_valid_until,
+            "outlier_sensors": sorted(self._sensors.outliers),
+            "sensor_flags": dict(self._sensors.flags),
+            "sensor_confidence": self._sensors.confidence(now),
             "fresh_sensor_count": len(self._sensor_temperatures),
             "available_sensors": self._temp_sensors,
-            "last_update": now.strftime("%H:%M:%S"),
+            "last_update": datetime.now().strftime("%H:%M:%S"),
             "learning_duration": round(self._learning_heating_duration / 60, 1),
             "cycle_status": self._cycle_status,
-            "time_remaining": round(self._time_remaining / 60, 1),
+            "time_remaining": time_remaining,
             "cycle_type": cycle_type,
             "off_time": round(self._off_time / 60, 1),
             "force_mode": self._force_mode,  # Add force mode to attributes
-        }
+            "last_switch_ms": self._last_switch_ms,
+            "learned_durations": {
+                self._duration_table.label(index): round(duration / 60, 1)
+                for index, duration in self._duration_table.learned()
+            },
+            "heat_source_plan": self._plan.as_dict() if self._plan else None,
+            "heat_pump_cost": heat_pump_cost,
+            "furnace_cost": round(self._economics.furnace_cost, 4),
+            "break_even_temperature": break_even,
+            "thermal_model": {
+                source: {
+                    "heating_rate": round(model.heating_rate, 3),
+                    "loss_coefficient": round(model.loss, 4),
+                    "samples": model.updates,
+                    "ready": model.ready,
+                }
+                for source, model in self._thermal.models.items()
+            },
+            "heat_pump_zones": {
+                heat_pump.zone: {
+                    "entity": heat_pump.entity_id,
+                    "controller": heat_pump.controller,
+                    "temperature": self._zone_temperature(heat_pump),
+                }
+                for heat_pump in self._heat_pumps
+            },
+            "command_stats": {
+                entity_id: stats.as_dict()
+                for entity_id, stats in self._commands.stats.items()
+            },
+        })
+        return self._attributes
 
-        return attributes
+    def _zone_temperature(self, heat_pump):
+        """Return the rounded temperature of a heat pump's zone sensors, if any."""
+        if not heat_pump.sensors:
+            return None
+        temperature = self._sensors.zone_temperature(heat_pump.sensors)
+        return None if temperature is None else round(temperature, 1)
 
     async def async_set_temperature(self, **kwargs):
         """Set new target temperature."""
         if (temp := kwargs.get(ATTR_TEMPERATURE)) is not None:
             self._target_temperature = temp
-            self._add_action(f"Set temperature to {temp}°C")
-            await self._control_heating()
-            self.async_write_ha_state()
-            self._add_action(f"Set temperature to {temp}°C")
+            self._add_action("Set temperature to %s°C", temp)
+            await self._scheduler.async_run()
 
     async def async_set_hvac_mode(self, hvac_mode: HVACMode) -> None:
         """Set new target hvac mode."""
@@ -341,64 +725,43 @@ class SmartThermostat(ClimateEntity):
             
         # Update mode first
         self._hvac_mode = hvac_mode
-        
+        self._async_schedule_save()
+
+        # The devices are driven from the next control pass so this never
+        # overlaps one
+        await self._scheduler.async_run(partial(self._async_apply_hvac_mode, hvac_mode))
+
+    async def _async_apply_hvac_mode(self, hvac_mode):
+        """Bring the devices in line with a new hvac mode; runs inside a pass."""
         # If turning off, update all states and return
         if hvac_mode == HVACMode.OFF and not self._system_enabled:
-                        # Turn off furnace
+            # Turn off furnace and heat pumps; separate controllers drain concurrently
             if self._hvac_entity:
-                await self._send_command(
-                    self._hvac_entity,
-                    'set_hvac_mode',
-                    {'hvac_mode': 'off'}
-                )
-                if self._heat_pump_entity:
-                # Turn off heat pump
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_hvac_mode',
-                        {'hvac_mode': 'off'}
+                await asyncio.gather(
+                    self._apply_device_state(self._hvac_entity, hvac_mode='off'),
+                    self._apply_heat_pump_state(hvac_mode='off'),
                 )
             self._hvac_action = HVACAction.OFF
             self._is_heating = False
             self._active_heat_source = None
             self._heating_start_time = None
             self._cooling_start_time = None
+            self._set_cycle_deadline(None)
             self._cycle_status = "off"
         elif hvac_mode == HVACMode.OFF and self._system_enabled:
 
             
             # Turn off furnace
+            commands = []
             if self._hvac_entity:
-                await self._send_command(
-                    self._hvac_entity,
-                    'set_hvac_mode',
-                    {'hvac_mode': 'off'}
-                )
+                commands.append(self._apply_device_state(self._hvac_entity, hvac_mode='off'))
             
-            # Set heat pump to minimum settings but don't turn off
-            if self._heat_pump_entity:
-                # Ensure heat pump is in heat mode first
-                await self._send_command(
-                    self._heat_pump_entity,
-                    'set_hvac_mode',
-                    {'hvac_mode': 'heat'}
-                )
-                await asyncio.sleep(self._command_delay)
-                
-                # Set minimum temperature
-                await self._send_command(
-                    self._heat_pump_entity,
-                    'set_temperature',
-                    {'temperature': 17}
-                )
-                await asyncio.sleep(self._command_delay)
+            # Set heat pumps to minimum settings but don't turn off
+            commands.append(self._set_heat_pump_minimum())
+            await asyncio.gather(*commands)
                 
                 # # Set low fan speed - only for heat pump
-                # await self._send_command(
-                #     self._heat_pump_entity,
-                #     'set_fan_mode',
-                #     {'fan_mode': 'low'}
-                # )
+                # await self._apply_device_state(self._heat_pump_entity, fan_mode='low')
             
             # Disable the smart thermostat system
             self._hvac_action = HVACAction.OFF
@@ -414,7 +777,7 @@ class SmartThermostat(ClimateEntity):
             # If turning on, determine appropriate heat source and activate it
             if self._force_mode:
                 self._active_heat_source = self._force_mode
-                self._add_action(f"Using forced heat source: {self._force_mode}")
+                self._add_action("Using forced heat source: %s", self._force_mode)
                 await self._switch_heat_source(self._force_mode)
             else:
                 # Only check outdoor temperature if not in force mode
@@ -423,32 +786,15 @@ class SmartThermostat(ClimateEntity):
             # Ensure heat source is set and activated immediately
             if self._active_heat_source == "furnace":
                 if self._hvac_entity:
-                    await self._send_command(
-                        self._hvac_entity,
-                        'set_hvac_mode',
-                        {'hvac_mode': 'heat'}
-                    )
-                    await self._send_command(
-                        self._hvac_entity,
-                        'set_temperature',
-                        {'temperature': self._max_temp}
+                    await self._apply_device_state(
+                        self._hvac_entity, hvac_mode='heat', temperature=self._max_temp
                     )
                     self._add_action("Activated furnace heating")
             elif self._active_heat_source == "heat_pump":
-                if self._heat_pump_entity:
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_hvac_mode',
-                        {'hvac_mode': 'heat'}
-                    )
-                    await asyncio.sleep(self._command_delay)
-                    
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_temperature',
-                        {'temperature': self._target_temperature}
-                    )
-                    self._add_action("Activated heat pump heating")
+                await self._apply_heat_pump_state(
+                    hvac_mode='heat', temperature=self._target_temperature
+                )
+                self._add_action("Activated heat pump heating")
         
 
         self.async_write_ha_state()
@@ -457,9 +803,8 @@ class SmartThermostat(ClimateEntity):
         """Turn the entity on."""
         self._system_enabled = True
         self._hvac_mode = HVACMode.HEAT
-        await self._check_outdoor_temperature()
-        await self._control_heating()
-        self.async_write_ha_state()
+        # Source selection can switch devices, so it runs inside the pass
+        await self._scheduler.async_run(self._check_outdoor_temperature)
 
     async def async_turn_off(self) -> None:
         """Turn the entity off."""
@@ -476,203 +821,159 @@ class SmartThermostat(ClimateEntity):
         now = datetime.now(timezone.utc)
         
         try:
-            forecast = self._hass.states.get(self._weather_entity)
-            if not forecast:
-                self._add_action(f"Weather entity {self._weather_entity} not found")
+            await self._outdoor.async_refresh()
+            outdoor_temp = self._outdoor.temperature_at(now.timestamp())
+            if outdoor_temp is None:
+                self._add_action("No outdoor temperature from %s", self._weather_entity, level=logging.WARNING)
                 return
-                
-            if not forecast.attributes.get("temperature"):
-                self._add_action(f"Temperature attribute missing from {self._weather_entity}")
-                return
-                
-            outdoor_temp = float(forecast.attributes.get("temperature"))
+
+            self._outdoor_temperature = outdoor_temp
             self._last_forecast_check = now
             
-            # Determine appropriate heat source using inclusive boundaries
-            new_source = None
+            # The heat pump can't run at or below its operating limit; above it
+            # the cheapest plan over the forecast decides
             if outdoor_temp <= self._outdoor_temp_furnace_threshold:
                 new_source = "furnace"
-                self._add_action(f"Temperature {outdoor_temp}°C is below furnace threshold {self._outdoor_temp_furnace_threshold}°C - using furnace")
-            elif outdoor_temp >= self._outdoor_temp_heat_pump_threshold:
-                new_source = "heat_pump"
-                self._add_action(f"Temperature {outdoor_temp}°C is above heat pump threshold {self._outdoor_temp_heat_pump_threshold}°C - using heat pump")
+                self._add_action(
+                    "Temperature %s°C is at or below heat pump limit %s°C - using furnace",
+                    outdoor_temp, self._outdoor_temp_furnace_threshold, level=logging.DEBUG
+                )
+            else:
+                new_source = self._plan_heat_source(now, outdoor_temp)
+                self._add_action(
+                    "Temperature %s°C: heat pump %.3f/kWh, furnace %.3f/kWh - plan %s picks %s",
+                    outdoor_temp, self._economics.heat_pump_cost(outdoor_temp),
+                    self._economics.furnace_cost, self._plan.schedule, new_source,
+                    level=logging.DEBUG
+                )
+
+            previous_source = self._active_heat_source
+            if previous_source is None or previous_source == new_source:
+                self._active_heat_source = new_source
+                self._add_action("Set active heat source to %s", new_source, level=logging.DEBUG)
+            elif previous_source == "furnace" and self._is_heating:
+                # Let the running burn finish; the switch happens once it is idle
+                self._pending_heat_source = new_source
+                self._add_action("Queued switch to %s after the current cycle", new_source)
             else:
-                # In transition zone - make an intelligent choice based on current source
-                # If no current source, prefer heat pump as it's generally more efficient
-                new_source = "heat_pump"
-                self._add_action(f"Temperature {outdoor_temp}°C is in transition zone ({self._outdoor_temp_furnace_threshold}°C to {self._outdoor_temp_heat_pump_threshold}°C) - using heat pump")
-            
-            # Always set active heat source before switching
-            self._active_heat_source = new_source
-            self._add_action(f"Set active heat source to {new_source}")
-            
-            # Only switch if needed
-            if new_source != self._active_heat_source:
                 await self._switch_heat_source(new_source)
                 
         except ValueError as e:
-            self._add_action(f"Error parsing temperature from {self._weather_entity}: {str(e)}")
+            self._add_action("Error parsing temperature from %s: %s", self._weather_entity, e, level=logging.WARNING)
         except Exception as e:
-            self._add_action(f"Unexpected error checking outdoor temperature: {str(e)}")
+            self._add_action("Unexpected error checking outdoor temperature: %s", e, level=logging.ERROR)
 
-    async def _get_current_state(self, entity_id):
-        """Get current state of an entity."""
-        state = self._hass.states.get(entity_id)
-        if not state:
-            return None
-        return {
-            'state': state.state,
-            'attributes': state.attributes
-        }
+    def _plan_heat_source(self, now, outdoor_temp):
+        """Return the heat source for the first hour of the cheapest plan."""
+        forecast = self._outdoor.temperatures(now.timestamp(), 3600, PLAN_HORIZON)
+        forecast = [outdoor_temp if temp is None else temp for temp in forecast]
 
-    async def _should_send_command(self, entity_id, command_type, new_value):
-        """Check if we should send a command based on current state and timing."""
-        if self._last_command_time:
-            time_since_last = (datetime.now() - self._last_command_time).total_seconds()
-            if time_since_last < self._command_delay:
-                await asyncio.sleep(self._command_delay - time_since_last)
-
-        current_state = await self._get_current_state(entity_id)
-        if not current_state:
-            return True  # If we can't get state, default to sending command
-
-        if entity_id == self._heat_pump_entity:
-            if command_type == 'mode' and self._heat_pump_last_mode == new_value:
-                return False
-            elif command_type == 'temperature' and self._heat_pump_last_temp == new_value:
-                return False
-            elif command_type == 'fan_mode' and self._heat_pump_last_fan == new_value:
-                return False
-        elif entity_id == self._hvac_entity:
-            if command_type == 'mode' and self._furnace_last_mode == new_value:
-                return False
-            elif command_type == 'temperature' and self._furnace_last_temp == new_value:
-                return False
-
-        return True
-
-    async def _send_command(self, entity_id, service, data):
-        """Send command with state tracking and delay."""
-        # Determine command type and value based on data parameters
-        command_type = None
-        command_value = None
-        
-        if 'hvac_mode' in data:
-            command_type = 'mode'
-            command_value = data['hvac_mode']
-        elif 'temperature' in data:
-            command_type = 'temperature'
-            command_value = data['temperature']
-        else:
-            command_type = 'other'
-            command_value = None
+        self._plan = self._planner.plan(
+            forecast, self._target_temperature, self._outdoor_temp_furnace_threshold,
+            current_source=self._active_heat_source
+        )
+        self._planned_outdoor_version = self._outdoor.version
+        return self._plan.source
 
-        self._add_action(f"Sending command - Entity: {entity_id}, Service: {service}, Data: {data}")
-        
-        should_send = True
-        if command_type != 'other':
-            should_send = await self._should_send_command(entity_id, command_type, command_value)
-            self._add_action(f"Command check - Type: {command_type}, Value: {command_value}, Should send: {should_send}")
-        
-        if not should_send:
-            self._add_action(f"Skipping duplicate command to {entity_id}: {service} {data}")
+    async def _async_replan(self):
+        """Redo source selection when the outdoor temperature or forecast changed."""
+        if self._force_mode:
             return
+        await self._outdoor.async_refresh()
+        if self._outdoor.version != self._planned_outdoor_version:
+            self._planned_outdoor_version = self._outdoor.version
+            await self._check_outdoor_temperature()
 
-        # Update last command time
-        self._last_command_time = datetime.now()
-
-        # Update state tracking before sending command
-        if entity_id == self._heat_pump_entity:
-            if command_type == 'mode':
-                self._heat_pump_last_mode = command_value
-            elif command_type == 'temperature':
-                self._heat_pump_last_temp = command_value
-        elif entity_id == self._hvac_entity:
-            if command_type == 'mode':
-                self._furnace_last_mode = command_value
-            elif command_type == 'temperature':
-                self._furnace_last_temp = command_value
-
-        self._add_action(f"State tracking updated - Last heat pump temp: {self._heat_pump_last_temp}, Last furnace temp: {self._furnace_last_temp}")
-
-        domain = 'climate'
-        
-        # Send the command
+    async def _apply_device_state(self, entity_id, **desired):
+        """Declare a device's desired state and send only what differs from it."""
         try:
-            await self._hass.services.async_call(
-                domain, service, {
-                    'entity_id': entity_id,
-                    **data
-                }
-            )
-            self._add_action(f"Command sent successfully - Domain: {domain}, Service: {service}")
+            commands = await self._reconciler.async_apply(entity_id, **desired)
         except Exception as e:
-            self._add_action(f"Error sending command: {str(e)}")
+            self._add_action("Error sending command: %s", e, level=logging.ERROR)
             raise
 
+        if not commands:
+            self._add_action("No change needed for %s: %s", entity_id, desired, level=logging.DEBUG)
+        for service, data in commands:
+            self._add_action("Command sent - climate.%s %s to %s", service, data, entity_id)
+        return commands
+
+    async def _apply_heat_pump_state(self, **desired):
+        """Declare the same desired state for every heat pump.
+
+        Heat pumps on different controllers are sent to in parallel, so the
+        whole house switches in one round-trip. Returns every command sent.
+        """
+        results = await asyncio.gather(*(
+            self._apply_device_state(heat_pump.entity_id, **desired)
+            for heat_pump in self._heat_pumps
+        ))
+        return [command for commands in results for command in commands]
+
+    async def _set_heat_pump_minimum(self):
+        """Keep the heat pumps in heat mode at their minimum setpoint."""
+        await self._apply_heat_pump_state(hvac_mode='heat', temperature=17)
+
     async def _switch_heat_source(self, source):
         """Switch between heat pump and furnace with state checking and delays."""
-        self._add_action(f"Switch heat source called - source: {source}, current: {self._active_heat_source}, force_mode: {self._force_mode}")
+        self._add_action(
+            "Switch heat source called - source: %s, current: %s, force_mode: %s",
+            source, self._active_heat_source, self._force_mode, level=logging.DEBUG
+        )
         
+        # An explicit switch supersedes one queued for the end of the cycle
+        self._pending_heat_source = None
+
         if source == self._active_heat_source:
-            self._add_action(f"Already using {source} - no switch needed")
+            self._add_action("Already using %s - no switch needed", source, level=logging.DEBUG)
             return
 
+        started = time.monotonic()
         try:
             if source == "furnace":
                 # Set heat pump to minimum settings and turn it off
                 try:
-                    self._add_action("Setting heat pump to minimum settings")
-                    
-                    # First set mode
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_hvac_mode',
-                        {'hvac_mode': 'heat'}
-                    )
-                    await asyncio.sleep(self._command_delay)
-
-                    # Then set temperature
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_temperature',
-                        {'temperature': 17}
-                    )
-                    self._heat_pump_last_temp = 17  # Explicitly set last temp
-                    self._add_action(f"Heat pump temperature set to 17°C (last_temp: {self._heat_pump_last_temp})")
+                    self._add_action("Setting heat pump to minimum settings", level=logging.DEBUG)
+                    await self._set_heat_pump_minimum()
+                    self._add_action("Heat pump temperature set to 17°C", level=logging.DEBUG)
 
                     if self._force_mode:
                         self._cycle_status = "forced"
                     
                 except Exception as e:
-                    self._add_action(f"Warning: Failed to set heat pump minimum settings: {str(e)}")
+                    self._add_action("Failed to set heat pump minimum settings: %s", e, level=logging.WARNING)
 
-                # Turn on furnace
+                # Turn on furnace; its cycle starts fresh on the next pass
                 self._active_heat_source = "furnace"
+                self._is_heating = False
 
             elif source == "heat_pump":
-                self._add_action("Starting switch to heat pump")
-                # Turn off furnace first
-                await self._send_command(self._hvac_entity, "set_hvac_mode", {"hvac_mode": HVACMode.OFF})
-                self._furnace_last_mode = HVACMode.OFF  # Explicitly set last mode
-                await asyncio.sleep(self._command_delay)
-                
-                # Turn on heat pump
-                await self._send_command(self._heat_pump_entity, "set_hvac_mode", {"hvac_mode": HVACMode.HEAT})
-                self._heat_pump_last_mode = HVACMode.HEAT  # Explicitly set last mode
+                self._add_action("Starting switch to heat pump", level=logging.DEBUG)
+                # Turn off furnace and turn on the heat pumps; each controller has its own lane
+                await asyncio.gather(
+                    self._apply_device_state(self._hvac_entity, hvac_mode=HVACMode.OFF),
+                    self._apply_heat_pump_state(hvac_mode=HVACMode.HEAT),
+                )
                 self._active_heat_source = "heat_pump"
+                # Any furnace cycle ends with the switch
+                self._heating_start_time = None
+                self._cooling_start_time = None
+                self._duration_bucket = None
+                self._set_cycle_deadline(None)
                 # Set cycle status based on force mode
                 if self._force_mode:
                     self._cycle_status = "forced"
-                self._add_action(f"Heat source switch complete - now using heat pump (last_heat_pump_temp: {self._heat_pump_last_temp})")
+                self._add_action("Heat source switch complete - now using heat pump")
 
         except Exception as e:
-            self._add_action(f"Error during heat source switch: {str(e)}")
+            self._add_action("Error during heat source switch: %s", e, level=logging.ERROR)
             raise
 
-        # Ensure state is written after switch
+        # The commands above resolve once the devices confirm them, so there is
+        # nothing else to wait for before publishing the switch
+        self._last_switch_ms = round((time.monotonic() - started) * 1000)
+        self._add_action("Switched to %s in %sms", source, self._last_switch_ms)
         self.async_write_ha_state()
-        await self._hass.async_block_till_done()
 
     async def _control_heating(self):
         """Control the heating based on temperature."""
@@ -683,21 +984,17 @@ class SmartThermostat(ClimateEntity):
         if not self._system_enabled:
             if self._is_heating:
                 # Turn off both heating systems
+                commands = []
                 if self._hvac_entity:
-                    await self._hass.services.async_call(
-                        'climate', 'set_hvac_mode',
-                        {'entity_id': self._hvac_entity, 'hvac_mode': 'off'}
-                    )
-                if self._heat_pump_entity:
-                    await self._hass.services.async_call(
-                        'climate', 'set_hvac_mode',
-                        {'entity_id': self._heat_pump_entity, 'hvac_mode': 'off'}
-                    )
+                    commands.append(self._apply_device_state(self._hvac_entity, hvac_mode='off'))
+                commands.append(self._apply_heat_pump_state(hvac_mode='off'))
+                await asyncio.gather(*commands)
                 
                 # Reset heating states
                 self._is_heating = False
                 self._heating_start_time = None
                 self._cooling_start_time = None
+                self._set_cycle_deadline(None)
                 self._hvac_action = HVACAction.OFF
                 # Preserve cycle status if in a cooling cycle
                 if not self._cycle_status.startswith("cooling cycle:"):
@@ -706,44 +1003,73 @@ class SmartThermostat(ClimateEntity):
                 self.async_write_ha_state()
             return
 
+        # Pick up a new forecast before deciding anything; under manual
+        # control (hvac_mode OFF) a replan must not switch the devices
+        if self._hvac_mode == HVACMode.HEAT:
+            await self._async_replan()
+
         # Dispatch to appropriate control method based on active heat source
         if self._active_heat_source == "heat_pump":
             await self._control_heating_heat_pump(current_temp)
         elif self._active_heat_source == "furnace":
             await self._control_heating_furnace(current_temp)
         else:
-            self._add_action("No active heat source selected")
+            self._add_action("No active heat source selected", level=logging.DEBUG)
+
+        # Re-apply the desired state to any device that drifted from it, e.g.
+        # after a lost command. With hvac_mode OFF the devices are left to
+        # manual control, so a manual change there is kept
+        if self._hvac_mode == HVACMode.HEAT:
+            await self._reconciler.async_reconcile_all()
+
+    def _heat_pump_setpoint(self, current_temp):
+        """Return the heat pump setpoint and status for a room temperature."""
+        temp_diff = self._target_temperature - current_temp
+        if temp_diff > 0.5:  # Below setpoint by more than 0.5°C
+            return self._max_temp, "max heating"
+        if abs(temp_diff) <= 0.5:  # Within 0.5°C of setpoint
+            return self._target_temperature, "maintaining"
+        return self._min_temp, "minimum heating"  # Above setpoint
+
+    async def _control_zone_heat_pump(self, heat_pump, house_temp):
+        """Set one heat pump from its zone's temperature, or the house's."""
+        current_temp = None
+        if heat_pump.sensors:
+            current_temp = self._sensors.zone_temperature(heat_pump.sensors)
+        if current_temp is None:
+            current_temp = house_temp
+        new_temp, status = self._heat_pump_setpoint(current_temp)
+
+        # The reconciler only sends if the heat pump isn't already there
+        if await self._apply_device_state(heat_pump.entity_id, temperature=new_temp):
+            self._add_action(
+                "Setting heat pump %s to %s°C (%s) - current temp: %.1f°C",
+                heat_pump.zone, new_temp, status, current_temp
+            )
 
     async def _control_heating_heat_pump(self, current_temp: float):
         """Control heat pump specific heating logic."""
         if self._hvac_mode == HVACMode.HEAT:
             if current_temp is not None:
-                # Calculate temperature difference
-                temp_diff = self._target_temperature - current_temp
+                # Every zone is set at once; controllers drain in parallel
+                await asyncio.gather(*(
+                    self._control_zone_heat_pump(heat_pump, current_temp)
+                    for heat_pump in self._heat_pumps
+                ))
                 
-                # Set heat pump temperature based on three states
-                if temp_diff > 0.5:  # Below setpoint by more than 0.5°C
-                    new_temp = self._max_temp
-                    status = "max heating"
-                elif abs(temp_diff) <= 0.5:  # Within 0.5°C of setpoint
-                    new_temp = self._target_temperature
-                    status = "maintaining"
-                else:  # Above setpoint
-                    new_temp = self._min_temp
-                    status = "minimum heating"
-                
-                # Send command only if temperature setting would change
-                if self._heat_pump_last_temp != new_temp:
-                    await self._send_command(
-                        self._heat_pump_entity,
-                        'set_temperature',
-                        {'temperature': new_temp}
+                self._is_heating = True
+                self._hvac_action = HVACAction.HEATING
+                self._cycle_status = f"heatpump {self._heat_pump_setpoint(current_temp)[1]}"
+            else:
+                # No room temperature: let the heat pumps regulate on their own sensors
+                if await self._apply_heat_pump_state(temperature=self._target_temperature):
+                    self._add_action(
+                        "No temperature - heat pumps holding %s°C on their own sensors",
+                        self._target_temperature, level=logging.WARNING
                     )
-                    self._add_action(f"Setting heat pump to {new_temp}°C ({status}) - current temp: {current_temp}°C")
-                
                 self._is_heating = True
                 self._hvac_action = HVACAction.HEATING
-                self._cycle_status = f"heatpump {status}"
+                self._cycle_status = "heatpump holding (no temperature)"
 
     async def _control_heating_furnace(self, current_temp: float):
         """Control furnace specific heating logic with cycles."""
@@ -751,20 +1077,30 @@ class SmartThermostat(ClimateEntity):
             self._cycle_status = "off"
             self._is_heating = False
             self._hvac_action = HVACAction.OFF
-            self._add_action("Control skipped: HVAC is off or no entity")
+            self._add_action("Control skipped: HVAC is off or no entity", level=logging.DEBUG)
             self.async_write_ha_state()
             return
 
 
         now = datetime.now()
         
+        # Without a temperature no new cycle starts; one in progress still ends
+        # on its deadline
+        below_target = (
+            current_temp is not None
+            and current_temp < (self._target_temperature - self._tolerance)
+        )
+
         # If we're not in any cycle and not cooling, ensure we're in ready state
         if not self._is_heating and not self._cooling_start_time:
-            self._cycle_status = "waiting to activate"
-            self._add_action(f"Status: ready, Temp: {current_temp:.1f}°C, Target: {self._target_temperature}°C, Heating: {self._is_heating}")
+            self._cycle_status = "waiting to activate" if current_temp is not None else "no temperature"
+            self._add_action(
+                "Status: ready, Temp: %s°C, Target: %s°C, Heating: %s",
+                current_temp, self._target_temperature, self._is_heating, level=logging.DEBUG
+            )
             
         # Start new heating cycle if needed and not in cooling period
-        if (current_temp < (self._target_temperature - self._tolerance) and 
+        if (below_target and 
             self._hvac_mode == HVACMode.HEAT and
             not self._is_heating and 
             not self._cooling_start_time):
@@ -781,16 +1117,14 @@ class SmartThermostat(ClimateEntity):
             self._cycle_status = f"heating cycle: {remaining_minutes}m remaining"
             
             if heating_elapsed >= self._learning_heating_duration:
-                await self._hass.services.async_call(
-                    'climate', 'set_hvac_mode',
-                    {'entity_id': self._hvac_entity, 'hvac_mode': 'off'}
-                )
+                await self._apply_device_state(self._hvac_entity, hvac_mode='off')
                 self._is_heating = False
                 self._hvac_action = HVACAction.OFF
                 self._heating_start_time = None
                 self._cooling_start_time = now
+                self._set_cycle_deadline(now + timedelta(seconds=self._off_time))
                 self._cycle_status = "cooling cycle: 20m remaining"
-                self._add_action(f"Completed heating cycle, starting {self._off_time/60:.1f}min cooling period")
+                self._add_action("Completed heating cycle, starting %.1fmin cooling period", self._off_time / 60)
                 self.async_write_ha_state()
                 return
 
@@ -800,13 +1134,20 @@ class SmartThermostat(ClimateEntity):
             remaining_time = max(0, self._off_time - cooling_elapsed)
             remaining_minutes = int(remaining_time / 60)
             self._cycle_status = f"cooling cycle: {remaining_minutes}m remaining"
-            self._add_action(f"Off period: {cooling_elapsed:.1f}s of {self._off_time}s ({cooling_elapsed/60:.1f}min of {self._off_time/60:.1f}min)")
+            self._add_action(
+                "Off period: %.1fs of %ss (%.1fmin of %.1fmin)",
+                cooling_elapsed, self._off_time, cooling_elapsed / 60, self._off_time / 60,
+                level=logging.DEBUG
+            )
             
             if cooling_elapsed >= self._off_time:
                 self._cycle_status = "waiting to activate"
                 
-                # Adjust learning duration based on temperature difference and cooling time
-                temp_diff = self._target_temperature - current_temp
+                # Adjust learning duration based on temperature difference and
+                # cooling time; an estimated temperature is no basis for learning
+                temp_diff = 0
+                if current_temp is not None and self._temperature_confidence == 1.0:
+                    temp_diff = self._target_temperature - current_temp
                 
                 if temp_diff > 0:  # We undershot
                     # Standard adjustment for undershooting
@@ -816,7 +1157,10 @@ class SmartThermostat(ClimateEntity):
                         self._maximum_heating_duration
                     )
                     if new_duration != self._learning_heating_duration:
-                        self._add_action(f"Undershot by {temp_diff:.1f}°C - Increasing duration to {new_duration/60:.1f}min (was {self._learning_heating_duration/60:.1f}min)")
+                        self._add_action(
+                            "Undershot by %.1f°C - Increasing duration to %.1fmin (was %.1fmin)",
+                            temp_diff, new_duration / 60, self._learning_heating_duration / 60
+                        )
                         self._learning_heating_duration = new_duration
                 elif temp_diff < 0:  # We overshot
                     # Calculate how much longer than _off_time we needed to wait
@@ -833,103 +1177,173 @@ class SmartThermostat(ClimateEntity):
                         )
                         if new_duration != self._learning_heating_duration:
                             self._add_action(
-                                f"Overshot by {abs(temp_diff):.1f}°C and needed {extra_cooling_time/60:.1f}min extra cooling - "
-                                f"Decreasing duration to {new_duration/60:.1f}min (was {self._learning_heating_duration/60:.1f}min)"
+                                "Overshot by %.1f°C and needed %.1fmin extra cooling - "
+                                "Decreasing duration to %.1fmin (was %.1fmin)",
+                                abs(temp_diff), extra_cooling_time / 60,
+                                new_duration / 60, self._learning_heating_duration / 60
                             )
                             self._learning_heating_duration = new_duration
                 
+                # Only the bucket this cycle ran in learns from it
+                if self._duration_bucket is not None:
+                    self._duration_table.set(self._duration_bucket, self._learning_heating_duration)
+                    self._duration_bucket = None
+
                 self._cooling_start_time = None  # Reset cooling start time
+                self._set_cycle_deadline(None)
                 self._add_action("Off period complete - ready for next cycle")
+
+                # A source change queued during the burn takes over from here
+                if self._pending_heat_source:
+                    new_source = self._pending_heat_source
+                    self._pending_heat_source = None
+                    self._add_action("Executing queued heat source change to %s", new_source)
+                    await self._switch_heat_source(new_source)
+                    self.async_write_ha_state()
+                    return
                 
                 # Immediately check if heating is needed
-                if current_temp < (self._target_temperature - self._tolerance):
-                    self._add_action(f"Temperature {current_temp:.1f}°C below target {self._target_temperature}°C - starting new heating cycle")
+                if below_target:
+                    self._add_action(
+                        "Temperature %.1f°C below target %s°C - starting new heating cycle",
+                        current_temp, self._target_temperature
+                    )
                     await self._start_heating_cycle(now, current_temp)
                 self.async_write_ha_state()
                 return
 
         # When cooling period completes, check for pending heat source change
-        if hasattr(self, '_pending_heat_source') and self._pending_heat_source:
+        if self._pending_heat_source:
             if self._cycle_status == "waiting to activate":
                 new_source = self._pending_heat_source
                 self._pending_heat_source = None
-                self._active_heat_source = new_source
                 await self._switch_heat_source(new_source)
-                self._add_action(f"Executing queued heat source change to {new_source}")
+                self._add_action("Executing queued heat source change to %s", new_source)
 
     async def _start_heating_cycle(self, now, current_temp):
         """Helper method to start a new heating cycle for furnace only."""
         if self._active_heat_source != "furnace":
             return
             
+        self._select_heating_duration(now, current_temp)
+
         # Calculate remaining time in minutes
         remaining_minutes = int(self._learning_heating_duration / 60)
         self._cycle_status = f"heating cycle: {remaining_minutes}m remaining"
-        await self._hass.services.async_call(
-            'climate', 'set_hvac_mode',
-            {'entity_id': self._hvac_entity, 'hvac_mode': 'heat'}
-        )
-        await self._hass.services.async_call(
-            'climate', 'set_temperature',
-            {'entity_id': self._hvac_entity, 'temperature': self._max_temp}
+        await self._apply_device_state(
+            self._hvac_entity, hvac_mode='heat', temperature=self._max_temp
         )
         self._is_heating = True
         self._heating_start_time = now
-        self._add_action(f"Started furnace heating cycle at {current_temp:.1f}°C for {remaining_minutes}m")
+        self._set_cycle_deadline(now + timedelta(seconds=self._learning_heating_duration))
+        self._add_action("Started furnace heating cycle at %.1f°C for %sm", current_temp, remaining_minutes)
+
+    def _select_heating_duration(self, now, current_temp):
+        """Size the next burn for the current outdoor temperature.
+
+        The learned duration for the outdoor temperature bucket is used until
+        the thermal model has converged, after which the model sizes the burn.
+        """
+        outdoor_temp = self._read_outdoor_temperature()
+        if outdoor_temp is None:
+            self._duration_bucket = None
+            return
+        self._duration_bucket = self._duration_table.index(outdoor_temp, now.hour)
+        self._learning_heating_duration = self._duration_table.lookup(
+            self._duration_bucket, self._learning_heating_duration
+        )
+
+        model = self._thermal.models.get("furnace")
+        if model is None or not model.ready:
+            return
+        seconds = model.time_to_reach(current_temp, outdoor_temp, self._target_temperature)
+        if seconds is None:
+            seconds = self._maximum_heating_duration
+        duration = min(max(seconds, self._minimum_heating_duration), self._maximum_heating_duration)
+        if duration != self._learning_heating_duration:
+            self._add_action(
+                "Thermal model predicts %.1fmin burn (%.2f°C/h gain, %.3f/h loss) - was %.1fmin",
+                duration / 60, model.heating_rate, model.loss, self._learning_heating_duration / 60
+            )
+            self._learning_heating_duration = duration
 
     async def async_update(self):
-        """Update the current temperature and control heating."""
-        # Update temperature before controlling heating
-        current_temp = self.current_temperature  # Store the result so it's actually used
+        """Run a control pass; sensor readings are already cached from events."""
+        await self._scheduler.async_run()
+
+    async def _async_control_pass(self):
+        """Run one control pass and publish the result."""
+        # Sensors that have gone quiet lose weight even without new events, and
+        # an estimate made without them moves on
+        now = time.time()
+        self._update_current_temperature(now, self._sensors.refresh(now))
         await self._control_heating()
-        # Schedule next update with force_refresh=True, but don't await it
-        self.async_schedule_update_ha_state(force_refresh=True) 
+        self._async_schedule_save()
+        self.async_write_ha_state()
 
     async def async_force_heat_source(self, source: str) -> None:
         """Force a specific heat source."""
-        self._add_action(f"Force heat source called with source: {source}")
+        self._add_action("Force heat source called with source: %s", source, level=logging.DEBUG)
         
         if source not in ["heat_pump", "furnace", None]:
             raise ValueError("Invalid heat source specified")
         
         # Set force mode and update state
         self._force_mode = source
-        self._add_action(f"Force mode set to: {self._force_mode}")
+        self._add_action("Force mode set to: %s", self._force_mode)
+        self._async_schedule_save()
         
-        # Ensure state is written before proceeding
+        # Publish the new force mode before switching
         self.async_write_ha_state()
-        await self._hass.async_block_till_done()
         
         if source:
-            self._add_action(f"Forcing heat source to {source}")
+            self._add_action("Forcing heat source to %s", source, level=logging.DEBUG)
             # Immediately switch to forced source if system is enabled
             if self._system_enabled:
-                self._add_action("System enabled, switching heat source")
-                await self._switch_heat_source(source)
+                self._add_action("System enabled, switching heat source", level=logging.DEBUG)
+                # Switched inside a control pass so it never overlaps one
+                await self._scheduler.async_run(partial(self._switch_heat_source, source))
             else:
                 self._add_action("System disabled, heat source switch queued")
         else:
             self._add_action("Cleared forced heat source")
-            # Return to normal temperature-based selection
-            await self._check_outdoor_temperature()
-            # Ensure state is written after temperature check
-            self.async_write_ha_state()
-            await self._hass.async_block_till_done()
+            # Return to normal temperature-based selection; the pass publishes the result
+            await self._scheduler.async_run(self._check_outdoor_temperature)
         
-        self._add_action(f"Force heat source complete - force_mode: {self._force_mode}, active_source: {self._active_heat_source}") 
+        self._add_action(
+            "Force heat source complete - force_mode: %s, active_source: %s",
+            self._force_mode, self._active_heat_source, level=logging.DEBUG
+        ) 
 
     async def async_added_to_hass(self):
         """Run when entity about to be added."""
         await super().async_added_to_hass()
 
-        # Use the new event tracking method
+        # Sensor states are parsed once by the shared hub for every thermostat
+        hub = async_get_sensor_hub(self.hass)
+
+        # Prime the reading cache from the current states
+        for sensor_id in self._temp_sensors:
+            self._async_update_sensor(sensor_id, *hub.reading(sensor_id))
+
+        # Pick up where we left off before the restart
+        await self._async_restore_state()
+
         @callback
-        def _async_sensor_changed(event):
+        def _async_sensor_changed(sensor_id, state, value):
             """Handle temperature changes."""
-            self.async_schedule_update_ha_state(True)
+            self._async_update_sensor(sensor_id, state, value)
+            self._scheduler.async_request()
 
+        self.async_on_remove(hub.async_subscribe(self._temp_sensors, _async_sensor_changed))
+        self.async_on_remove(self._async_cancel_sensor_expiry)
+        self.async_on_remove(self._scheduler.async_cancel)
+        self.async_on_remove(self._async_cancel_cycle_timer)
         self.async_on_remove(
-            async_track_state_change_event(
-                self.hass, self._temp_sensors, _async_sensor_changed
+            async_get_updater(self.hass).async_register(
+                self.entity_id, self.async_update, self._scan_interval
             )
-        ) 
\ No newline at end of file
+        )
+        self.async_on_remove(async_get_router(self.hass).async_add(self))
+        # Real outdoor changes trigger a pass that re-plans the heat source
+        self.async_on_remove(self._outdoor.async_add_listener(self._scheduler.async_request))
@@ -0,0 +1,377 @@
+"""Per-device command dispatch for the Smart Thermostat."""
+import asyncio
+from collections import OrderedDict
+import logging
+import time
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+_LOGGER = logging.getLogger(__name__)
+
+COMMAND_TIMEOUT = 10  # Seconds to wait for a device to reflect a command
+COMMAND_RETRIES = 2  # Resends before a command is counted as lost
+RETRY_BACKOFF = 1  # Seconds before the first resend, doubled on each retry
+
+# Field -> (service, service data key), in the order they are applied
+_FIELDS = (
+    ("hvac_mode", "set_hvac_mode", "hvac_mode"),
+    ("temperature", "set_temperature", "temperature"),
+    ("fan_mode", "set_fan_mode", "fan_mode"),
+)
+_SERVICE_FIELDS = {service: field for field, service, _ in _FIELDS}
+_UNSET = object()
+
+
+def _actual_value(state, field):
+    """Return the value of a desired-state field as reported by the device."""
+    if field == "hvac_mode":
+        return state.state
+    return state.attributes.get(field)
+
+
+def _matches(field, desired, actual):
+    """Return True if the device already reflects the desired value."""
+    if actual is None:
+        return False
+    if field == "temperature":
+        try:
+            return abs(float(actual) - float(desired)) < 0.05
+        except (TypeError, ValueError):
+            return False
+    return str(actual) == str(desired)
+
+
+
+class CommandStats:
+    """Counters for the commands sent to one device."""
+
+    __slots__ = ("sent", "confirmed", "retried", "lost")
+
+    def __init__(self):
+        self.sent = 0
+        self.confirmed = 0
+        self.retried = 0
+        self.lost = 0
+
+    def as_dict(self):
+        """Return the counters as a plain dict."""
+        return {
+            "sent": self.sent,
+            "confirmed": self.confirmed,
+            "retried": self.retried,
+            "lost": self.lost,
+        }
+
+
+class _PendingCommand:
+    """A queued service call and everyone waiting on it."""
+
+    __slots__ = ("data", "futures")
+
+    def __init__(self, data, future):
+        self.data = data
+        self.futures = [future]
+
+    def resolve(self, result):
+        """Resolve every waiter with the command outcome."""
+        for future in self.futures:
+            if not future.done():
+                future.set_result(result)
+
+
+class _CommandLane:
+    """Serialize commands through one transmitter, collapsing superseded ones.
+
+    A lane belongs to one device, or to a controller such as an IR blaster
+    shared by several devices, which can only send one command at a time.
+    Only one call per device and service is ever queued: a newer
+    set_temperature replaces a pending one instead of queueing behind it. Each
+    command is held until the device state reflects it (or it times out), so
+    pacing follows the device rather than a fixed sleep.
+    """
+
+    def __init__(self, hass, delay, timeout_for, stats_for):
+        self._hass = hass
+        self._delay = delay
+        self._timeout_for = timeout_for  # entity_id -> confirmation timeout
+        self._stats_for = stats_for  # entity_id -> CommandStats
+        self._pending = OrderedDict()  # (entity_id, service) -> _PendingCommand
+        self._last_sent = None
+        self._task = None
+
+    def send(self, entity_id, service, data):
+        """Queue a command and return a future resolved once it is confirmed.
+
+        The future's result is True if the device reflected the command and
+        False if it was lost after all retries.
+        """
+        future = self._hass.loop.create_future()
+        key = (entity_id, service)
+        pending = self._pending.get(key)
+        if pending is not None:
+            _LOGGER.debug(
+                "Coalescing %s for %s: %s superseded by %s",
+                service, entity_id, pending.data, data
+            )
+            pending.data = data
+            pending.futures.append(future)
+            self._pending.move_to_end(key)
+        else:
+            self._pending[key] = _PendingCommand(data, future)
+
+        if self._task is None or self._task.done():
+            self._task = self._hass.async_create_task(self._async_drain())
+        return future
+
+    async def _async_drain(self):
+        """Send queued commands, pacing consecutive calls through this lane."""
+        while self._pending:
+            if self._last_sent is not None:
+                wait = self._delay - (time.monotonic() - self._last_sent)
+                if wait > 0:
+                    # Commands arriving while we wait can still be coalesced
+                    await asyncio.sleep(wait)
+                    continue
+
+            key, command = self._pending.popitem(last=False)
+            try:
+                confirmed = await self._async_send_confirmed(*key, command)
+            except Exception as err:  # pylint: disable=broad-except
+                for future in command.futures:
+                    if not future.done():
+                        future.set_exception(err)
+                continue
+
+            if confirmed is None:
+                # Superseded while retrying; the newer command answers for it
+                self._pending[key].futures.extend(command.futures)
+                continue
+            command.resolve(confirmed)
+
+    async def _async_send_confirmed(self, entity_id, service, command):
+        """Send a command and retry with backoff until the device reflects it.
+
+        Returns True when confirmed, False when lost and None when a newer
+        command for the same device and service arrived before it was confirmed.
+        """
+        field = _SERVICE_FIELDS.get(service)
+        stats = self._stats_for(entity_id)
+        for attempt in range(COMMAND_RETRIES + 1):
+            if attempt:
+                stats.retried += 1
+                await asyncio.sleep(RETRY_BACKOFF * 2 ** (attempt - 1))
+                if (entity_id, service) in self._pending:
+                    return None
+                _LOGGER.debug(
+                    "Retrying %s %s for %s (attempt %s)",
+                    service, command.data, entity_id, attempt + 1
+                )
+
+            self._last_sent = time.monotonic()
+            stats.sent += 1
+            if field is None:
+                # Nothing in the device state to confirm against
+                await self._async_call(entity_id, service, command.data)
+                return True
+            if await self._async_call_confirmed(entity_id, service, command.data, field):
+                stats.confirmed += 1
+                return True
+
+        stats.lost += 1
+        _LOGGER.warning(
+            "%s %s for %s was not confirmed after %s attempts",
+            service, command.data, entity_id, COMMAND_RETRIES + 1
+        )
+        return False
+
+    async def _async_call(self, entity_id, service, data):
+        """Fire the service call at the device."""
+        await self._hass.services.async_call(
+            "climate", service, {"entity_id": entity_id, **data}
+        )
+
+    async def _async_call_confirmed(self, entity_id, service, data, field):
+        """Fire the service call and wait for the device state to reflect it."""
+        value = next(iter(data.values()))
+        confirmed = asyncio.Event()
+
+        @callback
+        def _async_state_changed(event):
+            new_state = event.data.get("new_state")
+            if new_state is not None and _matches(field, value, _actual_value(new_state, field)):
+                confirmed.set()
+
+        # Subscribe before sending so a fast device can't beat us to it
+        unsub = async_track_state_change_event(
+            self._hass, [entity_id], _async_state_changed
+        )
+        try:
+            await self._async_call(entity_id, service, data)
+            state = self._hass.states.get(entity_id)
+            if state is not None and _matches(field, value, _actual_value(state, field)):
+                return True
+            try:
+                await asyncio.wait_for(confirmed.wait(), self._timeout_for(entity_id))
+            except asyncio.TimeoutError:
+                return False
+            return True
+        finally:
+            unsub()
+
+
+class CommandDispatcher:
+    """Route climate service calls through one lane per controller.
+
+    A device has its own lane unless controllers maps it to the controller
+    that transmits for it (e.g. the IR blaster behind a SmartIR heat pump);
+    devices sharing a controller queue behind each other, and different lanes
+    drain concurrently, so a slow IR blaster never holds up the cloud
+    thermostat or the heat pumps on other blasters.
+    """
+
+    def __init__(self, hass, delay, timeout=COMMAND_TIMEOUT, controllers=None):
+        self._hass = hass
+        self._delay = delay
+        # Confirmation timeout, either for every device or per entity
+        if isinstance(timeout, dict):
+            self._timeouts = dict(timeout)
+            self._default_timeout = COMMAND_TIMEOUT
+        else:
+            self._timeouts = {}
+            self._default_timeout = timeout
+        self._controllers = dict(controllers or {})  # entity_id -> controller
+        self._lanes = {}  # controller (or entity_id) -> _CommandLane
+        self.stats = {}  # entity_id -> CommandStats
+
+    @property
+    def version(self):
+        """Return a number that changes whenever any counter changes."""
+        return sum(
+            stats.sent + stats.confirmed + stats.retried + stats.lost
+            for stats in self.stats.values()
+        )
+
+    def controller(self, entity_id):
+        """Return the lane a device's commands are queued on."""
+        return self._controllers.get(entity_id, entity_id)
+
+    def _timeout(self, entity_id):
+        return self._timeouts.get(entity_id, self._default_timeout)
+
+    def _stats(self, entity_id):
+        stats = self.stats.get(entity_id)
+        if stats is None:
+            stats = self.stats[entity_id] = CommandStats()
+        return stats
+
+    def async_send(self, entity_id, service, data):
+        """Queue a command for a device and return a future for its confirmation."""
+        self._stats(entity_id)
+        controller = self.controller(entity_id)
+        lane = self._lanes.get(controller)
+        if lane is None:
+            lane = self._lanes[controller] = _CommandLane(
+                self._hass, self._delay, self._timeout, self._stats
+            )
+        return lane.send(entity_id, service, data)
+
+
+class DesiredState:
+    """What a device should be doing; None means "don't care"."""
+
+    __slots__ = ("hvac_mode", "temperature", "fan_mode")
+
+    def __init__(self):
+        self.hvac_mode = None
+        self.temperature = None
+        self.fan_mode = None
+
+    def __repr__(self):
+        return (
+            f"DesiredState(hvac_mode={self.hvac_mode}, "
+            f"temperature={self.temperature}, fan_mode={self.fan_mode})"
+        )
+
+
+class Reconciler:
+    """Drive devices toward their desired state with the fewest service calls.
+
+    Callers declare what each device should be doing; the reconciler diffs that
+    against the device's actual state in Home Assistant and sends only the
+    commands needed to close the gap. A command that was just sent is given
+    settle_time to show up in the device state before it is sent again, which
+    also re-applies the desired state after a manual change or a lost command.
+    """
+
+    def __init__(self, hass, dispatcher, settle_time):
+        self._hass = hass
+        self._dispatcher = dispatcher
+        self._settle_time = settle_time
+        self._desired = {}  # entity_id -> DesiredState
+        self._sent = {}  # (entity_id, field) -> (value, monotonic time sent)
+
+    def desired(self, entity_id):
+        """Return the desired state for a device."""
+        desired = self._desired.get(entity_id)
+        if desired is None:
+            desired = self._desired[entity_id] = DesiredState()
+        return desired
+
+    def reset(self):
+        """Forget every desired state and in-flight command."""
+        self._desired.clear()
+        self._sent.clear()
+
+    async def async_apply(self, entity_id, hvac_mode=_UNSET, temperature=_UNSET, fan_mode=_UNSET):
+        """Update a device's desired state and reconcile it.
+
+        Returns the list of (service, data) commands that were sent.
+        """
+        desired = self.desired(entity_id)
+        if hvac_mode is not _UNSET:
+            desired.hvac_mode = hvac_mode
+        if temperature is not _UNSET:
+            desired.temperature = temperature
+        if fan_mode is not _UNSET:
+            desired.fan_mode = fan_mode
+        return await self.async_reconcile(entity_id)
+
+    async def async_reconcile(self, entity_id):
+        """Send the commands needed to bring one device to its desired state."""
+        desired = self._desired.get(entity_id)
+        if desired is None:
+            return []
+
+        state = self._hass.states.get(entity_id)
+        now = time.monotonic()
+        commands = []
+        futures = []
+        for field, service, key in _FIELDS:
+            value = getattr(desired, field)
+            if value is None:
+                continue
+            if state is not None and _matches(field, value, _actual_value(state, field)):
+                self._sent.pop((entity_id, field), None)
+                continue
+            sent = self._sent.get((entity_id, field))
+            if sent is not None and sent[0] == value and now - sent[1] < self._settle_time:
+                continue  # Already on its way
+
+            self._sent[(entity_id, field)] = (value, now)
+            data = {key: value}
+            commands.append((service, data))
+            futures.append(self._dispatcher.async_send(entity_id, service, data))
+
+        if futures:
+            results = await asyncio.gather(*futures)
+            for (service, data), confirmed in zip(commands, results):
+                if not confirmed:
+                    # Lost: let the next reconcile send it again right away
+                    self._sent.pop((entity_id, _SERVICE_FIELDS[service]), None)
+        return commands
+
+    async def async_reconcile_all(self):
+        """Reconcile every device with a desired state."""
+        if self._desired:
+            await asyncio.gather(*(self.async_reconcile(entity_id) for entity_id in self._desired))
@@ -0,0 +1,2 @@
+"""Constants for the Smart Thermostat integration."""
+DOMAIN = "smart_thermostat"
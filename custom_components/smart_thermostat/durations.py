@@ -0,0 +1,89 @@
+"""Learned furnace burn durations bucketed by outdoor temperature."""
+from array import array
+import math
+
+DURATION_BUCKET_MIN = -30  # °C; colder readings share the first bucket
+DURATION_BUCKET_MAX = 20  # °C; warmer readings share the last bucket
+DURATION_BUCKET_SIZE = 5  # °C per outdoor temperature bucket
+TIME_OF_DAY_BUCKETS = 1  # Buckets per day; 1 ignores the time of day
+
+
+class DurationTable:
+    """Flat array of learned durations, one cell per (time of day, outdoor) bucket.
+
+    Unlearned cells hold NaN. Lookups are O(1) index arithmetic; a cell that has
+    not been learned yet borrows from the nearest learned outdoor bucket in the
+    same time-of-day row so a new bucket starts from a sensible guess.
+    """
+
+    def __init__(self, bucket_size=DURATION_BUCKET_SIZE, time_of_day_buckets=TIME_OF_DAY_BUCKETS,
+                 min_temp=DURATION_BUCKET_MIN, max_temp=DURATION_BUCKET_MAX):
+        self._bucket_size = bucket_size
+        self._min_temp = min_temp
+        self._temp_buckets = max(1, math.ceil((max_temp - min_temp) / bucket_size))
+        self._day_buckets = min(max(1, time_of_day_buckets), 24)  # At least an hour each
+        self._values = array("d", [math.nan]) * (self._temp_buckets * self._day_buckets)
+        self.version = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def index(self, outdoor_temp, hour=0):
+        """Return the cell for an outdoor temperature and hour of day."""
+        temp_bucket = int((outdoor_temp - self._min_temp) // self._bucket_size)
+        temp_bucket = min(max(temp_bucket, 0), self._temp_buckets - 1)
+        day_bucket = int(hour * self._day_buckets // 24) % self._day_buckets
+        return day_bucket * self._temp_buckets + temp_bucket
+
+    def lookup(self, index, default):
+        """Return the learned duration for a cell, borrowing from its neighbours."""
+        value = self._values[index]
+        if not math.isnan(value):
+            return value
+        row = index - index % self._temp_buckets
+        column = index - row
+        for offset in range(1, self._temp_buckets):
+            for neighbour in (column - offset, column + offset):
+                if 0 <= neighbour < self._temp_buckets:
+                    value = self._values[row + neighbour]
+                    if not math.isnan(value):
+                        return value
+        return default
+
+    def set(self, index, duration):
+        """Store the duration learned for a cell."""
+        if self._values[index] != duration:
+            self._values[index] = duration
+            self.version += 1
+
+    def label(self, index):
+        """Return a readable name for a cell, e.g. "-5..0°C" or "-5..0°C 06-12h"."""
+        day_bucket, temp_bucket = divmod(index, self._temp_buckets)
+        low = self._min_temp + temp_bucket * self._bucket_size
+        label = f"{low}..{low + self._bucket_size}°C"
+        if self._day_buckets > 1:
+            label += f" {self._first_hour(day_bucket):02d}-{self._first_hour(day_bucket + 1):02d}h"
+        return label
+
+    def _first_hour(self, day_bucket):
+        """Return the first whole hour that index() puts in a time-of-day bucket."""
+        return -(-day_bucket * 24 // self._day_buckets)
+
+    def learned(self):
+        """Yield (index, duration) for every learned cell."""
+        for index, value in enumerate(self._values):
+            if not math.isnan(value):
+                yield index, value
+
+    def as_list(self):
+        """Return the cells for storage, with None for unlearned ones."""
+        return [None if math.isnan(value) else value for value in self._values]
+
+    def load(self, values):
+        """Restore cells saved with as_list; a table of another shape is ignored."""
+        if not values or len(values) != len(self._values):
+            return False
+        for index, value in enumerate(values):
+            self._values[index] = math.nan if value is None else float(value)
+        self.version += 1
+        return True
@@ -0,0 +1,76 @@
+"""Heat source economics for the Smart Thermostat."""
+import numpy as np
+
+# (outdoor °C, COP) points for a typical air-source heat pump
+DEFAULT_COP_CURVE = ((-25, 1.5), (-15, 1.9), (-5, 2.4), (0, 2.8), (5, 3.3), (10, 3.8), (15, 4.3))
+ELECTRICITY_PRICE = 0.15  # Per kWh of electricity
+GAS_PRICE = 0.05  # Per kWh of gas
+FURNACE_EFFICIENCY = 0.9  # Delivered heat per unit of gas
+ECONOMICS_MIN_TEMP = -40  # °C; the lookup grid covers this range
+ECONOMICS_MAX_TEMP = 30
+ECONOMICS_STEP = 0.5  # °C between grid points
+
+
+def parse_cop_curve(value):
+    """Return COP curve points from a {temp: cop} mapping or [[temp, cop], ...] list."""
+    if isinstance(value, dict):
+        points = value.items()
+    else:
+        points = value
+    return tuple(sorted((float(temp), float(cop)) for temp, cop in points))
+
+
+class EnergyEconomics:
+    """Cost per kWh of delivered heat for each source, by outdoor temperature.
+
+    The COP curve and prices are folded into a fixed grid once at startup, so
+    a lookup is an index calculation and one linear interpolation. The
+    break-even temperature above which the heat pump is cheaper is found at the
+    same time.
+    """
+
+    def __init__(self, cop_curve=DEFAULT_COP_CURVE, electricity_price=ELECTRICITY_PRICE,
+                 gas_price=GAS_PRICE, furnace_efficiency=FURNACE_EFFICIENCY,
+                 min_temp=ECONOMICS_MIN_TEMP, max_temp=ECONOMICS_MAX_TEMP, step=ECONOMICS_STEP):
+        points = parse_cop_curve(cop_curve)
+        self._min_temp = min_temp
+        self._step = step
+        self.temperatures = np.arange(min_temp, max_temp + step / 2, step)
+        cop = np.interp(
+            self.temperatures, [point[0] for point in points], [point[1] for point in points]
+        )
+        self.heat_pump_costs = electricity_price / cop
+        self._heat_pump_costs = self.heat_pump_costs.tolist()  # Plain floats for scalar lookups
+        self.furnace_cost = gas_price / furnace_efficiency
+        self.break_even = self._find_break_even()
+
+    def _find_break_even(self):
+        """Return the outdoor temperature above which the heat pump is cheaper, or None.
+
+        A COP curve that isn't monotonic can cross more than once; only the
+        last crossing counts, and only if the heat pump wins everywhere above it.
+        """
+        cheaper = self.heat_pump_costs <= self.furnace_cost
+        crossings = np.flatnonzero(cheaper[1:] & ~cheaper[:-1]) + 1
+        if not len(crossings) or not cheaper[-1]:
+            return None
+        index = int(crossings[-1])  # First grid point of the range the heat pump wins
+        low, high = self.heat_pump_costs[index - 1], self.heat_pump_costs[index]
+        fraction = (low - self.furnace_cost) / (low - high)
+        return float(self.temperatures[index - 1] + fraction * self._step)
+
+    def heat_pump_cost(self, outdoor_temp):
+        """Return the heat pump's cost per kWh delivered at an outdoor temperature."""
+        costs = self._heat_pump_costs
+        position = (outdoor_temp - self._min_temp) / self._step
+        if position <= 0:
+            return costs[0]
+        index = int(position)
+        if index >= len(costs) - 1:
+            return costs[-1]
+        fraction = position - index
+        return costs[index] + fraction * (costs[index + 1] - costs[index])
+
+    def heat_pump_costs_at(self, outdoor):
+        """Return heat pump costs per kWh delivered for an array of temperatures."""
+        return np.interp(outdoor, self.temperatures, self.heat_pump_costs)
@@ -0,0 +1,146 @@
+"""Shared, cached hourly weather forecasts for the Smart Thermostat."""
+from array import array
+from bisect import bisect_right
+import logging
+import time
+
+from homeassistant.exceptions import HomeAssistantError
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_FORECASTS = "smart_thermostat_forecasts"
+FORECAST_TTL = 1800  # Seconds before the hourly forecast is fetched again
+FORECAST_RETRY = 300  # Seconds before retrying a failed fetch
+
+
+def async_get_forecast_cache(hass, entity_id, ttl=FORECAST_TTL):
+    """Return the forecast cache for a weather entity, shared by every thermostat."""
+    caches = hass.data.setdefault(DATA_FORECASTS, {})
+    cache = caches.get(entity_id)
+    if cache is None:
+        cache = caches[entity_id] = ForecastCache(hass, entity_id, ttl)
+    return cache
+
+
+class ForecastCache:
+    """Hourly outdoor temperature forecast for one weather entity.
+
+    The forecast is fetched with weather.get_forecasts at most once per TTL and
+    kept as parallel time/temperature arrays. The current observation from the
+    entity state is parsed only when the state object changes and anchors the
+    start of the curve, so "temperature at t" is a bisect and a lerp.
+    """
+
+    def __init__(self, hass, entity_id, ttl=FORECAST_TTL):
+        self._hass = hass
+        self._entity_id = entity_id
+        self._ttl = ttl
+        self._times = array("d")  # Epoch seconds, ascending
+        self._temperatures = array("d")
+        self._next_fetch = 0.0  # Monotonic time of the next fetch
+        self._fetch_task = None
+        self._observed_state = None
+        self._observed = None  # (timestamp, temperature) from the entity state
+        self.version = 0
+
+    def __len__(self):
+        return len(self._times)
+
+    @property
+    def horizon(self):
+        """Return the epoch time of the last forecast point, or None."""
+        return self._times[-1] if self._times else None
+
+    async def async_refresh(self):
+        """Fetch the forecast if the cached one has expired.
+
+        Concurrent callers share one in-flight fetch.
+        """
+        if time.monotonic() < self._next_fetch:
+            return
+        if self._fetch_task is None:
+            self._fetch_task = self._hass.async_create_task(self._async_fetch())
+        task = self._fetch_task
+        try:
+            await task
+        finally:
+            if self._fetch_task is task:
+                self._fetch_task = None
+
+    async def _async_fetch(self):
+        """Call weather.get_forecasts and store the hourly temperatures."""
+        try:
+            response = await self._hass.services.async_call(
+                "weather", "get_forecasts",
+                {"entity_id": self._entity_id, "type": "hourly"},
+                blocking=True, return_response=True,
+            )
+            forecast = response[self._entity_id]["forecast"]
+        except (HomeAssistantError, KeyError, TypeError) as err:
+            _LOGGER.debug("No hourly forecast from %s: %s", self._entity_id, err)
+            self._next_fetch = time.monotonic() + FORECAST_RETRY
+            return
+
+        points = []
+        for entry in forecast:
+            when = dt_util.parse_datetime(str(entry.get("datetime")))
+            temperature = entry.get("temperature")
+            if when is None or temperature is None:
+                continue
+            points.append((when.timestamp(), float(temperature)))
+        points.sort()
+
+        self._times = array("d", (point[0] for point in points))
+        self._temperatures = array("d", (point[1] for point in points))
+        self._next_fetch = time.monotonic() + self._ttl
+        self.version += 1
+
+    def observation(self):
+        """Return the current (timestamp, temperature) from the entity state."""
+        state = self._hass.states.get(self._entity_id)
+        if state is not self._observed_state:
+            self._observed_state = state
+            self._observed = None
+            if state is not None:
+                try:
+                    self._observed = (
+                        state.last_updated.timestamp(),
+                        float(state.attributes.get("temperature")),
+                    )
+                except (TypeError, ValueError):
+                    pass
+        return self._observed
+
+    def temperature_at(self, timestamp, observed=None):
+        """Return the interpolated outdoor temperature at an epoch time, or None.
+
+        observed, a (timestamp, temperature) pair, replaces the entity's own
+        observation as the start of the curve when given.
+        """
+        times = self._times
+        temperatures = self._temperatures
+        if observed is None:
+            observed = self.observation()
+
+        if not times or timestamp <= times[0]:
+            if observed is None:
+                return temperatures[0] if times else None
+            if not times or timestamp <= observed[0] or times[0] <= observed[0]:
+                return observed[1]
+            # Between now and the first forecast point
+            fraction = (timestamp - observed[0]) / (times[0] - observed[0])
+            return observed[1] + fraction * (temperatures[0] - observed[1])
+
+        index = bisect_right(times, timestamp)
+        if index >= len(times):
+            return temperatures[-1]
+        start, end = times[index - 1], times[index]
+        fraction = (timestamp - start) / (end - start)
+        return temperatures[index - 1] + fraction * (temperatures[index] - temperatures[index - 1])
+
+    def temperatures(self, start, step, count, observed=None):
+        """Return count interpolated temperatures from start, step seconds apart."""
+        if observed is None:
+            observed = self.observation()
+        return [self.temperature_at(start + step * offset, observed) for offset in range(count)]
@@ -0,0 +1,187 @@
+"""Robust fusion of several temperature sensors into one control temperature."""
+from bisect import bisect_left, insort
+from collections import deque
+
+from .kalman import SensorFilter
+
+FUSION_WINDOW = 3  # Recent reports per sensor; their median rejects single spikes
+OUTLIER_THRESHOLD = 3.0  # Scaled MADs from the median before a sensor is rejected
+OUTLIER_MIN_DEVIATION = 1.0  # °C; sensors this close to the median are never rejected
+_MAD_SCALE = 1.4826  # Makes the MAD comparable to a standard deviation
+
+
+def _median_deviation(ordered, median):
+    """Return the median absolute deviation of sorted values from their median.
+
+    Deviations grow outwards from the median on both sides, so merging the two
+    sides reaches the middle deviation without sorting them.
+    """
+    count = len(ordered)
+    right = bisect_left(ordered, median)
+    left = right - 1
+    previous = current = 0.0
+    for _ in range(count // 2 + 1):
+        previous = current
+        if left >= 0 and (right >= count or median - ordered[left] <= ordered[right] - median):
+            current = median - ordered[left]
+            left -= 1
+        else:
+            current = ordered[right] - median
+            right += 1
+    return current if count % 2 else (previous + current) / 2
+
+
+class _SensorWindow:
+    """Short rolling window of one sensor's reports."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, size):
+        self.values = deque(maxlen=size)
+
+    def add(self, value):
+        """Add a report, evicting the oldest when the window is full."""
+        self.values.append(value)
+
+    @property
+    def median(self):
+        """Return the median of the window (a handful of values, so O(1))."""
+        ordered = sorted(self.values)
+        middle = len(ordered) // 2
+        if len(ordered) % 2:
+            return ordered[middle]
+        return (ordered[middle - 1] + ordered[middle]) / 2
+
+
+class RobustFusion:
+    """Inverse-variance weighted fusion of per-sensor filters with MAD outlier rejection.
+
+    Each sensor keeps a short rolling window whose median ignores a single
+    noisy report and feeds a Kalman filter. A sensor whose estimate sits more
+    than OUTLIER_THRESHOLD scaled MADs from the median of all sensors (one near
+    a radiator or in the sun) is left out; the rest are weighted by their
+    configured weight over the filter's variance at the time of fusion, so a
+    sensor that has gone quiet counts for less and less. Sensors reported with
+    include=False keep their filters up to date but are left out entirely.
+    """
+
+    def __init__(self, weights=None, window=FUSION_WINDOW,
+                 threshold=OUTLIER_THRESHOLD, min_deviation=OUTLIER_MIN_DEVIATION):
+        self._weights = dict(weights or {})
+        self._window = window
+        self._threshold = threshold
+        self._min_deviation = min_deviation
+        self._windows = {}  # sensor_id -> _SensorWindow
+        self._filters = {}  # sensor_id -> SensorFilter
+        self._smoothed = {}  # sensor_id -> filtered estimate
+        self._ordered = []  # Sorted estimates of the included sensors, for the median
+        self.outliers = frozenset()
+        self.value = None
+
+    def __len__(self):
+        return len(self._smoothed)
+
+    def __contains__(self, sensor_id):
+        return sensor_id in self._smoothed
+
+    def weight(self, sensor_id):
+        """Return the configured weight of a sensor (1 by default)."""
+        return self._weights.get(sensor_id, 1.0)
+
+    @property
+    def smoothed(self):
+        """Return the live sensor_id -> estimate mapping of included sensors (do not mutate)."""
+        return self._smoothed
+
+    def interval(self, sensor_id):
+        """Return a sensor's learned report interval in seconds, if known."""
+        sensor_filter = self._filters.get(sensor_id)
+        return sensor_filter.interval if sensor_filter else None
+
+    def variance(self, sensor_id, now):
+        """Return the variance of a sensor's estimate as of now, if tracked."""
+        sensor_filter = self._filters.get(sensor_id)
+        if sensor_filter is None:
+            return None
+        return sensor_filter.variance_at(now)
+
+    def update(self, sensor_id, value, timestamp, include=True):
+        """Fold a new report into its sensor's filter and recompute the fused value."""
+        window = self._windows.get(sensor_id)
+        if window is None:
+            window = self._windows[sensor_id] = _SensorWindow(self._window)
+            self._filters[sensor_id] = SensorFilter()
+        sensor_filter = self._filters[sensor_id]
+        self._discard(sensor_id)
+        window.add(value)
+        sensor_filter.update(window.median, timestamp)
+        if include:
+            self._smoothed[sensor_id] = sensor_filter.estimate
+            insort(self._ordered, sensor_filter.estimate)
+        self._fuse(timestamp)
+
+    def exclude(self, sensor_id, now):
+        """Leave a sensor out of the fusion until it next reports, keeping its filter."""
+        self._discard(sensor_id)
+        self._fuse(now)
+
+    def remove(self, sensor_id, now):
+        """Drop a sensor and its history from the fusion."""
+        self._discard(sensor_id)
+        self._windows.pop(sensor_id, None)
+        self._filters.pop(sensor_id, None)
+        self._fuse(now)
+
+    def value_without(self, sensor_id, now):
+        """Return the fused value of every other sensor as of now, or None."""
+        weighted_sum, weight_total = self._weighted(now, skip=sensor_id)
+        return weighted_sum / weight_total if weight_total > 0 else None
+
+    def refresh(self, now):
+        """Recompute the fused value as the sensors' variances grow, and return it."""
+        self._fuse(now)
+        return self.value
+
+    def _discard(self, sensor_id):
+        smoothed = self._smoothed.pop(sensor_id, None)
+        if smoothed is not None:
+            del self._ordered[bisect_left(self._ordered, smoothed)]
+
+    def _fuse(self, now):
+        """Recompute the fused value from the estimates minus any outliers."""
+        ordered = self._ordered
+        count = len(ordered)
+        if not count:
+            self.outliers = frozenset()
+            self.value = None
+            return
+
+        middle = count // 2
+        median = ordered[middle] if count % 2 else (ordered[middle - 1] + ordered[middle]) / 2
+
+        outliers = frozenset()
+        if count >= 3:
+            mad = _median_deviation(ordered, median)
+            limit = max(self._threshold * _MAD_SCALE * mad, self._min_deviation)
+            # The estimates are sorted, so only the ends need checking
+            if median - ordered[0] > limit or ordered[-1] - median > limit:
+                outliers = frozenset(
+                    sensor_id for sensor_id, value in self._smoothed.items()
+                    if abs(value - median) > limit
+                )
+
+        self.outliers = outliers
+        weighted_sum, weight_total = self._weighted(now)
+        self.value = weighted_sum / weight_total if weight_total > 0 else median
+
+    def _weighted(self, now, skip=None):
+        """Return the weighted sum and total weight of the included non-outliers."""
+        weighted_sum = 0.0
+        weight_total = 0.0
+        for sensor_id, value in self._smoothed.items():
+            if sensor_id == skip or sensor_id in self.outliers:
+                continue
+            weight = self.weight(sensor_id) / self._filters[sensor_id].variance_at(now)
+            weighted_sum += weight * value
+            weight_total += weight
+        return weighted_sum, weight_total
@@ -0,0 +1,45 @@
+"""Heat pump zones for the Smart Thermostat."""
+
+
+class HeatPump:
+    """One heat pump, the zone it heats and the controller that sends its commands."""
+
+    __slots__ = ("entity_id", "controller", "zone", "sensors")
+
+    def __init__(self, entity_id, controller=None, zone=None, sensors=()):
+        self.entity_id = entity_id
+        self.controller = controller or entity_id  # Devices on one controller share a lane
+        self.zone = zone or entity_id
+        self.sensors = tuple(sensors)  # Zone sensors; empty means the whole house
+
+    def __repr__(self):
+        return (
+            f"HeatPump({self.entity_id}, controller={self.controller}, "
+            f"zone={self.zone}, sensors={list(self.sensors)})"
+        )
+
+
+def parse_heat_pumps(value):
+    """Return HeatPumps from entity ids or {entity, controller, zone, temperature_sensors} maps."""
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    heat_pumps = []
+    for entry in value:
+        if isinstance(entry, str):
+            heat_pumps.append(HeatPump(entry))
+            continue
+        entity_id = entry.get("entity")
+        if not entity_id:
+            raise ValueError(f"Heat pump {entry} has no entity")
+        heat_pumps.append(HeatPump(
+            entity_id,
+            entry.get("controller"),
+            entry.get("zone"),
+            entry.get("temperature_sensors", ()),
+        ))
+    entity_ids = [heat_pump.entity_id for heat_pump in heat_pumps]
+    if len(set(entity_ids)) != len(entity_ids):
+        raise ValueError(f"Heat pumps listed more than once: {entity_ids}")
+    return heat_pumps
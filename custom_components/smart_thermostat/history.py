@@ -0,0 +1,86 @@
+"""Structured action history for the Smart Thermostat."""
+from datetime import datetime
+import logging
+import time
+
+HISTORY_SIZE = 50  # Meaningful actions kept for the entity attributes
+
+
+class _Event:
+    """A single history record; the message is only formatted when read."""
+
+    __slots__ = ("timestamp", "level", "message", "args")
+
+    def __init__(self):
+        self.timestamp = 0.0
+        self.level = logging.NOTSET
+        self.message = ""
+        self.args = ()
+
+    def format(self):
+        """Return the record as a "[HH:MM:SS] message" string."""
+        message = self.message % self.args if self.args else self.message
+        timestamp = datetime.fromtimestamp(self.timestamp).strftime("%H:%M:%S")
+        return f"[{timestamp}] {message}"
+
+
+class _Ring:
+    """Fixed-size ring of preallocated records, overwritten in place."""
+
+    __slots__ = ("_records", "_next", "_count")
+
+    def __init__(self, size):
+        self._records = [_Event() for _ in range(size)]
+        self._next = 0
+        self._count = 0
+
+    def add(self, timestamp, level, message, args):
+        """Overwrite the oldest record with a new event."""
+        record = self._records[self._next]
+        record.timestamp = timestamp
+        record.level = level
+        record.message = message
+        record.args = args
+        self._next = (self._next + 1) % len(self._records)
+        self._count = min(self._count + 1, len(self._records))
+
+    def __iter__(self):
+        """Iterate records newest first."""
+        size = len(self._records)
+        for offset in range(1, self._count + 1):
+            yield self._records[(self._next - offset) % size]
+
+    def __len__(self):
+        return self._count
+
+
+class ActionHistory:
+    """Ring buffer of structured events at INFO and above.
+
+    Messages are stored as a %-style template plus its arguments and are only
+    formatted when the history is read, so recording an event on the control
+    path costs a few attribute writes. DEBUG chatter is left to the logger so
+    it cannot evict meaningful events.
+    """
+
+    def __init__(self, size=HISTORY_SIZE):
+        self._events = _Ring(size)
+        self._formatted = None
+        self.version = 0
+
+    def add(self, message, args=(), level=logging.INFO):
+        """Record an event; DEBUG events are not kept."""
+        if level <= logging.DEBUG:
+            return
+        self._events.add(time.time(), level, message, args)
+        self._formatted = None
+        self.version += 1
+
+    def entries(self):
+        """Return the formatted INFO and above events, newest first."""
+        if self._formatted is None:
+            self._formatted = tuple(event.format() for event in self._events)
+        return self._formatted
+
+    def __len__(self):
+        return len(self._events)
@@ -0,0 +1,82 @@
+"""Shared temperature sensor subscriptions for the Smart Thermostat."""
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .sensors import parse_temperature
+
+DATA_SENSOR_HUB = "smart_thermostat_sensor_hub"
+
+
+@callback
+def async_get_sensor_hub(hass):
+    """Return the sensor hub shared by every thermostat."""
+    hub = hass.data.get(DATA_SENSOR_HUB)
+    if hub is None:
+        hub = hass.data[DATA_SENSOR_HUB] = SensorHub(hass)
+    return hub
+
+
+class SensorHub:
+    """One state listener per sensor entity, shared by every thermostat.
+
+    Each state change is parsed once and the parsed value is handed to every
+    thermostat subscribed to that sensor, so event handling scales with the
+    number of distinct sensors rather than with the zones that read them.
+    """
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._subscribers = {}  # sensor_id -> [listener, ...]
+        self._unsubs = {}  # sensor_id -> state listener unsubscribe
+        self._readings = {}  # sensor_id -> (state, value) last parsed
+
+    def reading(self, sensor_id):
+        """Return (state, value) for a sensor's current state, parsing it only once."""
+        state = self._hass.states.get(sensor_id)
+        cached = self._readings.get(sensor_id)
+        if cached is None or cached[0] is not state:
+            cached = (state, parse_temperature(state))
+            if sensor_id in self._subscribers:
+                self._readings[sensor_id] = cached
+        return cached
+
+    @callback
+    def async_subscribe(self, sensor_ids, listener):
+        """Call listener(sensor_id, state, value) on each change; return a callback to stop."""
+        sensor_ids = list(dict.fromkeys(sensor_ids))
+        for sensor_id in sensor_ids:
+            subscribers = self._subscribers.get(sensor_id)
+            if subscribers is None:
+                subscribers = self._subscribers[sensor_id] = []
+                self._unsubs[sensor_id] = async_track_state_change_event(
+                    self._hass, [sensor_id], self._async_state_changed
+                )
+            subscribers.append(listener)
+
+        @callback
+        def async_unsubscribe():
+            for sensor_id in sensor_ids:
+                subscribers = self._subscribers.get(sensor_id)
+                if subscribers is None:
+                    continue
+                for index, subscriber in enumerate(subscribers):
+                    if subscriber is listener:
+                        del subscribers[index]
+                        break
+                if not subscribers:
+                    # Last thermostat reading this sensor: stop listening to it
+                    del self._subscribers[sensor_id]
+                    self._unsubs.pop(sensor_id)()
+                    self._readings.pop(sensor_id, None)
+
+        return async_unsubscribe
+
+    @callback
+    def _async_state_changed(self, event):
+        """Parse a sensor's new state once and fan it out."""
+        sensor_id = event.data["entity_id"]
+        state = event.data.get("new_state")
+        value = parse_temperature(state)
+        self._readings[sensor_id] = (state, value)
+        for listener in tuple(self._subscribers.get(sensor_id, ())):
+            listener(sensor_id, state, value)
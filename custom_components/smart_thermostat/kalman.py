@@ -0,0 +1,78 @@
+"""Per-sensor scalar Kalman filtering for the Smart Thermostat."""
+import math
+
+KALMAN_PROCESS_NOISE = 4e-4  # °C² per second the room temperature may wander
+KALMAN_MEASUREMENT_NOISE = 0.02  # °C² of noise in a single report
+KALMAN_RESET_GATE = 3.0  # Innovation in standard deviations treated as a real level change
+INTERVAL_SMOOTHING = 0.2  # Weight of the newest gap in the report interval average
+INTERVAL_MIN_REPORTS = 3  # Gaps seen before the learned interval is trusted
+
+
+class SensorFilter:
+    """Random-walk Kalman filter over one sensor's reports.
+
+    Tracks the estimated temperature and its variance, and learns how often the
+    sensor reports. Between reports the variance keeps growing, linearly while
+    the sensor is on schedule and quadratically once it is overdue, so a sensor
+    that goes quiet fades out of the fusion instead of dropping off a cliff.
+    """
+
+    __slots__ = (
+        "estimate", "variance", "updated", "_interval", "_gaps",
+        "_process_noise", "_measurement_noise",
+    )
+
+    def __init__(self, process_noise=KALMAN_PROCESS_NOISE,
+                 measurement_noise=KALMAN_MEASUREMENT_NOISE):
+        self._process_noise = process_noise
+        self._measurement_noise = measurement_noise
+        self.estimate = None
+        self.variance = None
+        self.updated = None
+        self._interval = None
+        self._gaps = 0
+
+    @property
+    def interval(self):
+        """Return the learned report interval in seconds, once trusted."""
+        if self._gaps < INTERVAL_MIN_REPORTS:
+            return None
+        return self._interval
+
+    def update(self, value, timestamp):
+        """Fold a report into the estimate and the report interval."""
+        if self.estimate is None:
+            self.estimate = value
+            self.variance = self._measurement_noise
+            self.updated = timestamp
+            return
+
+        gap = timestamp - self.updated
+        if gap > 0:
+            if self._interval is None:
+                self._interval = gap
+            else:
+                self._interval += INTERVAL_SMOOTHING * (gap - self._interval)
+            self._gaps += 1
+
+        prior = self.variance_at(timestamp)
+        innovation = value - self.estimate
+        if abs(innovation) > KALMAN_RESET_GATE * math.sqrt(prior + self._measurement_noise):
+            # Far outside what noise explains: the room really changed, so
+            # follow it rather than averaging the old level in
+            self.estimate = value
+            self.variance = self._measurement_noise
+        else:
+            gain = prior / (prior + self._measurement_noise)
+            self.estimate += gain * innovation
+            self.variance = (1 - gain) * prior
+        self.updated = max(self.updated, timestamp)
+
+    def variance_at(self, now):
+        """Return the estimate's variance as of now."""
+        age = max(now - self.updated, 0.0)
+        growth = self._process_noise * age
+        interval = self.interval
+        if interval:
+            growth *= 1 + age / interval
+        return self.variance + growth
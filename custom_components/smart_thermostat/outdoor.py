@@ -0,0 +1,167 @@
+"""Shared outdoor conditions for the Smart Thermostat."""
+import logging
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_track_state_change_event
+
+from .forecast import async_get_forecast_cache
+from .hub import async_get_sensor_hub
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_OUTDOOR = "smart_thermostat_outdoor"
+OUTDOOR_REPLACE = "replace"  # Local sensors replace the weather observation
+OUTDOOR_FUSE = "fuse"  # Local sensors are averaged with the weather observation
+OUTDOOR_CHANGE_THRESHOLD = 0.5  # °C the current temperature must move to notify
+
+
+@callback
+def async_get_outdoor_conditions(hass, weather_entity, outdoor_sensors=(), mode=OUTDOOR_REPLACE):
+    """Return the outdoor conditions for a weather entity and local sensors, shared."""
+    key = (weather_entity, tuple(sorted(outdoor_sensors)), mode if outdoor_sensors else None)
+    providers = hass.data.setdefault(DATA_OUTDOOR, {})
+    provider = providers.get(key)
+    if provider is None:
+        provider = providers[key] = OutdoorConditions(hass, weather_entity, outdoor_sensors, mode)
+    return provider
+
+
+class OutdoorConditions:
+    """Current outdoor temperature and hourly forecast for a group of thermostats.
+
+    The current temperature comes from the weather entity's observation, or
+    from local outdoor sensors that replace or are averaged with it, and
+    anchors the start of the shared forecast curve. Both are tracked from
+    state change events while anyone listens, and listeners are only called
+    when the current temperature moves by OUTDOOR_CHANGE_THRESHOLD or a new
+    forecast arrives, so heat source selection reruns on real outdoor changes.
+    """
+
+    def __init__(self, hass, weather_entity, outdoor_sensors=(), mode=OUTDOOR_REPLACE):
+        self._hass = hass
+        self._weather_entity = weather_entity
+        self._outdoor_sensors = list(outdoor_sensors)
+        self._mode = mode
+        self._forecast = async_get_forecast_cache(hass, weather_entity)
+        self._forecast_version = self._forecast.version
+        self._sensor_values = {}  # sensor_id -> (timestamp, temperature) or None
+        self._current = None  # (timestamp, temperature)
+        self._notified = None  # Temperature listeners were last told about
+        self._listeners = []
+        self._unsubs = []
+        self.version = 0
+
+    @property
+    def current(self):
+        """Return the current outdoor temperature, or None."""
+        current = self._observed()
+        return current[1] if current else None
+
+    def _observed(self):
+        """Return the current (timestamp, temperature), recomputing it unsubscribed."""
+        if not self._listeners:
+            # Nobody keeps the readings up to date, so read them now
+            hub = async_get_sensor_hub(self._hass)
+            for sensor_id in self._outdoor_sensors:
+                self._store_sensor(sensor_id, *hub.reading(sensor_id))
+            self._current = self._combine()
+        return self._current
+
+    def _store_sensor(self, sensor_id, state, value):
+        if value is None:
+            self._sensor_values[sensor_id] = None
+        else:
+            self._sensor_values[sensor_id] = (state.last_updated.timestamp(), value)
+
+    def _combine(self):
+        """Combine the local sensors and the weather observation."""
+        observed = self._forecast.observation()
+        readings = [reading for reading in self._sensor_values.values() if reading is not None]
+        if not readings:
+            return observed
+        if self._mode == OUTDOOR_FUSE and observed is not None:
+            readings.append(observed)
+        return (
+            max(reading[0] for reading in readings),
+            sum(reading[1] for reading in readings) / len(readings),
+        )
+
+    async def async_refresh(self):
+        """Fetch the forecast if it has expired and notify listeners of a new one."""
+        await self._forecast.async_refresh()
+        if self._forecast.version != self._forecast_version:
+            self._forecast_version = self._forecast.version
+            self._async_notify()
+
+    def temperature_at(self, timestamp):
+        """Return the outdoor temperature at an epoch time, or None."""
+        return self._forecast.temperature_at(timestamp, self._observed())
+
+    def temperatures(self, start, step, count):
+        """Return count outdoor temperatures from start, step seconds apart."""
+        return self._forecast.temperatures(start, step, count, self._observed())
+
+    @callback
+    def async_add_listener(self, listener):
+        """Call listener() on real outdoor changes; return a callback to stop."""
+        if not self._listeners:
+            self._async_start()
+        self._listeners.append(listener)
+
+        @callback
+        def async_remove():
+            for index, existing in enumerate(self._listeners):
+                if existing is listener:
+                    del self._listeners[index]
+                    break
+            if not self._listeners:
+                self._async_stop()
+
+        return async_remove
+
+    @callback
+    def _async_start(self):
+        """Subscribe to the weather entity and the local sensors."""
+        hub = async_get_sensor_hub(self._hass)
+        for sensor_id in self._outdoor_sensors:
+            self._store_sensor(sensor_id, *hub.reading(sensor_id))
+        self._unsubs.append(async_track_state_change_event(
+            self._hass, [self._weather_entity], self._async_weather_changed
+        ))
+        if self._outdoor_sensors:
+            self._unsubs.append(hub.async_subscribe(self._outdoor_sensors, self._async_sensor_changed))
+        self._current = self._combine()
+        self._notified = self._current[1] if self._current else None
+
+    @callback
+    def _async_stop(self):
+        for unsub in self._unsubs:
+            unsub()
+        self._unsubs = []
+
+    @callback
+    def _async_weather_changed(self, _event):
+        self._async_update()
+
+    @callback
+    def _async_sensor_changed(self, sensor_id, state, value):
+        self._store_sensor(sensor_id, state, value)
+        self._async_update()
+
+    @callback
+    def _async_update(self):
+        """Recombine the current temperature and notify on a real change."""
+        self._current = self._combine()
+        temperature = self._current[1] if self._current else None
+        notified = self._notified
+        if (temperature is None) != (notified is None) or (
+            temperature is not None and abs(temperature - notified) >= OUTDOOR_CHANGE_THRESHOLD
+        ):
+            self._notified = temperature
+            self._async_notify()
+
+    @callback
+    def _async_notify(self):
+        self.version += 1
+        for listener in tuple(self._listeners):
+            listener()
@@ -0,0 +1,95 @@
+"""Receding-horizon heat source planning for the Smart Thermostat."""
+from itertools import combinations
+
+import numpy as np
+
+from .economics import EnergyEconomics
+
+PLAN_HORIZON = 24  # Hours of forecast each plan covers
+PLAN_MAX_SWITCHES = 2  # Source changes allowed within one plan
+HEAT_LOSS = 0.25  # kW of heat lost per °C between indoors and outdoors
+SWITCH_PENALTY = 0.05  # Cost charged per change of heat source
+_INFEASIBLE = 1e9  # Finite stand-in for infinity so 0 * cost stays 0
+
+
+def _candidate_schedules(hours, max_switches):
+    """Return every schedule with at most max_switches changes and its switch count.
+
+    Rows are hours, True meaning furnace and False heat pump.
+    """
+    rows = []
+    for start in (False, True):
+        for count in range(max_switches + 1):
+            for points in combinations(range(1, hours), count):
+                row = np.full(hours, start)
+                for point in points:
+                    row[point:] = ~row[point:]
+                rows.append(row)
+    schedules = np.array(rows, dtype=bool)
+    switches = np.count_nonzero(schedules[:, 1:] != schedules[:, :-1], axis=1)
+    return schedules, switches
+
+
+class Plan:
+    """The cheapest schedule found by the planner."""
+
+    __slots__ = ("source", "cost", "schedule")
+
+    def __init__(self, source, cost, schedule):
+        self.source = source
+        self.cost = cost
+        self.schedule = schedule  # One letter per hour: F furnace, H heat pump
+
+    def as_dict(self):
+        """Return the plan as a plain dict for the entity attributes."""
+        return {"source": self.source, "cost": round(self.cost, 2), "schedule": self.schedule}
+
+
+class HeatSourcePlanner:
+    """Choose the heat source by costing candidate schedules over the forecast.
+
+    Every schedule with up to PLAN_MAX_SWITCHES source changes is precomputed
+    as a boolean matrix, so costing them all is two matrix-vector products.
+    Only the first hour of the winning schedule is acted on; the plan is redone
+    as the forecast moves.
+    """
+
+    def __init__(self, economics=None, horizon=PLAN_HORIZON, heat_loss=HEAT_LOSS,
+                 switch_penalty=SWITCH_PENALTY, max_switches=PLAN_MAX_SWITCHES):
+        self._economics = economics or EnergyEconomics()
+        self._horizon = horizon
+        self._heat_loss = heat_loss
+        self._switch_penalty = switch_penalty
+        self._schedules, self._switches = _candidate_schedules(horizon, max_switches)
+
+    def plan(self, outdoor, setpoint, heat_pump_min_temp, current_source=None):
+        """Return the cheapest Plan for an hourly outdoor temperature forecast.
+
+        Hours below heat_pump_min_temp are infeasible for the heat pump.
+        """
+        outdoor = np.asarray(outdoor[:self._horizon], dtype=float)
+        hours = len(outdoor)
+        schedules = self._schedules[:, :hours]
+        switches = self._switches if hours == self._horizon else np.count_nonzero(
+            schedules[:, 1:] != schedules[:, :-1], axis=1
+        )
+
+        demand = self._heat_loss * np.clip(setpoint - outdoor, 0, None)  # kWh per hour
+        heat_pump_cost = demand * self._economics.heat_pump_costs_at(outdoor)
+        feasible = outdoor >= heat_pump_min_temp
+        heat_pump_cost = np.where(feasible, heat_pump_cost, _INFEASIBLE)
+        furnace_cost = demand * self._economics.furnace_cost
+
+        costs = schedules @ furnace_cost + (~schedules) @ heat_pump_cost
+        costs = costs + switches * self._switch_penalty
+        if current_source is not None:
+            # Leaving the current source right away is a switch too
+            costs = costs + (schedules[:, 0] != (current_source == "furnace")) * self._switch_penalty
+
+        best = int(np.argmin(costs))
+        row = schedules[best]
+        return Plan(
+            "furnace" if row[0] else "heat_pump",
+            float(costs[best]),
+            "".join("F" if hour else "H" for hour in row),
+        )
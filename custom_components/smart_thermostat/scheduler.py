@@ -0,0 +1,228 @@
+"""Scheduling of Smart Thermostat control passes and periodic updates."""
+import asyncio
+from datetime import timedelta
+import logging
+import time
+import zlib
+
+from homeassistant.core import callback
+from homeassistant.helpers.event import async_call_later, async_track_time_interval
+
+_LOGGER = logging.getLogger(__name__)
+
+CONTROL_DEBOUNCE = 2  # Seconds to collect sensor triggers into one control pass
+DATA_UPDATER = "smart_thermostat_updater"
+UPDATE_CONCURRENCY = 3  # Periodic updates allowed to run at once
+UPDATE_TICK = timedelta(seconds=10)  # How often due updates are looked for
+
+
+class ControlScheduler:
+    """Run control passes one at a time.
+
+    Triggers that arrive while a pass is running collapse into a single
+    follow-up pass, and background triggers (sensor events) are debounced so a
+    burst of updates costs one pass. Callers that need to drive devices hand
+    that work in as an action, which runs at the start of the next pass
+    rather than alongside a running one.
+    """
+
+    def __init__(self, hass, control, debounce=CONTROL_DEBOUNCE):
+        self._hass = hass
+        self._control = control
+        self._debounce = debounce
+        self._debounce_unsub = None
+        self._task = None
+        self._requested = 0  # Generation of the latest trigger
+        self._started = 0  # Generation covered by the running/last pass
+        self._waiters = []  # (generation, future) for callers awaiting a pass
+        self._actions = []  # Work to run at the start of the next pass
+
+    @property
+    def running(self):
+        """Return True while a control pass is in progress."""
+        return self._task is not None
+
+    @callback
+    def async_request(self):
+        """Request a control pass after the debounce window."""
+        if self._debounce_unsub is not None:
+            return
+        if self._debounce <= 0:
+            self._async_trigger()
+            return
+        self._debounce_unsub = async_call_later(
+            self._hass, self._debounce, self._async_debounced
+        )
+
+    @callback
+    def async_request_now(self):
+        """Request a control pass without waiting for the debounce window."""
+        self._async_cancel_debounce()
+        self._async_trigger()
+
+    async def async_run(self, action=None):
+        """Run a control pass now and wait for it.
+
+        If a pass is already running, this waits for the follow-up pass so the
+        caller's changes are always seen by the pass it waits on. action, if
+        given, is awaited at the start of that pass, before the control.
+        """
+        if action is not None:
+            self._actions.append(action)
+        self._async_cancel_debounce()  # This pass covers any pending request
+        generation = self._async_trigger()
+        future = self._hass.loop.create_future()
+        self._waiters.append((generation, future))
+        await future
+
+    @callback
+    def async_cancel(self):
+        """Cancel any pending debounced pass."""
+        self._async_cancel_debounce()
+
+    @callback
+    def _async_debounced(self, _now):
+        """Debounce window elapsed."""
+        self._debounce_unsub = None
+        self._async_trigger()
+
+    @callback
+    def _async_cancel_debounce(self):
+        if self._debounce_unsub is not None:
+            self._debounce_unsub()
+            self._debounce_unsub = None
+
+    @callback
+    def _async_trigger(self):
+        """Record a trigger and start the pass loop if it is idle."""
+        self._requested += 1
+        if self._task is None:
+            self._task = self._hass.async_create_task(self._async_loop())
+        return self._requested
+
+    async def _async_loop(self):
+        """Run passes until every trigger has been covered by one."""
+        try:
+            while self._started < self._requested:
+                self._started = self._requested
+                error = None
+                actions, self._actions = self._actions, []
+                for action in actions:
+                    try:
+                        await action()
+                    except Exception as err:  # pylint: disable=broad-except
+                        error = error or err
+                try:
+                    await self._control()
+                except Exception as err:  # pylint: disable=broad-except
+                    error = error or err
+                self._async_resolve(self._started, error)
+        finally:
+            self._task = None
+
+    @callback
+    def _async_resolve(self, generation, error):
+        """Release the callers whose trigger the finished pass covered."""
+        waiting = []
+        for waiter_generation, future in self._waiters:
+            if waiter_generation > generation:
+                waiting.append((waiter_generation, future))
+            elif not future.done():
+                if error is None:
+                    future.set_result(None)
+                else:
+                    future.set_exception(error)
+        if error is not None and len(waiting) == len(self._waiters):
+            # Nobody was waiting on this pass, so nobody else will report it
+            _LOGGER.error("Control pass failed: %s", error, exc_info=error)
+        self._waiters = waiting
+
+
+@callback
+def async_get_updater(hass):
+    """Return the periodic updater shared by every thermostat."""
+    updater = hass.data.get(DATA_UPDATER)
+    if updater is None:
+        updater = hass.data[DATA_UPDATER] = PeriodicUpdater(hass)
+    return updater
+
+
+class _UpdateEntry:
+    """One registered periodic update."""
+
+    __slots__ = ("update", "interval", "due", "running")
+
+    def __init__(self, update, interval, due):
+        self.update = update
+        self.interval = interval
+        self.due = due
+        self.running = False
+
+
+class PeriodicUpdater:
+    """Run each thermostat's periodic update on its own staggered interval.
+
+    Every registration gets a fixed offset within its interval, derived from
+    its key, so a fleet of zones doesn't call services in the same instant.
+    Due updates run concurrently, at most UPDATE_CONCURRENCY at a time, and an
+    update still running when it comes due again is skipped rather than
+    queued, so one slow instance never holds up the others.
+    """
+
+    def __init__(self, hass, concurrency=UPDATE_CONCURRENCY, tick=UPDATE_TICK):
+        self._hass = hass
+        self._tick = tick
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._entries = {}  # key -> _UpdateEntry
+        self._unsub = None
+
+    @staticmethod
+    def offset(key, interval):
+        """Return the stable offset in seconds of a key within its interval."""
+        return zlib.crc32(key.encode()) % 1000 / 1000 * interval
+
+    @callback
+    def async_register(self, key, update, interval):
+        """Run update every interval (a timedelta); return a callback to stop."""
+        seconds = interval.total_seconds()
+        entry = _UpdateEntry(update, seconds, time.monotonic() + self.offset(key, seconds))
+        self._entries[key] = entry
+        if self._unsub is None:
+            self._unsub = async_track_time_interval(self._hass, self._async_tick, self._tick)
+
+        @callback
+        def async_unregister():
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+            if not self._entries and self._unsub is not None:
+                self._unsub()
+                self._unsub = None
+
+        return async_unregister
+
+    @callback
+    def _async_tick(self, _now=None):
+        """Start every update that has come due."""
+        now = time.monotonic()
+        for key, entry in self._entries.items():
+            if entry.due > now:
+                continue
+            # Keep the phase, but don't try to catch up on missed runs
+            entry.due += entry.interval
+            if entry.due <= now:
+                entry.due = now + entry.interval
+            if entry.running:
+                _LOGGER.debug("Periodic update of %s still running - skipped", key)
+                continue
+            entry.running = True
+            self._hass.async_create_task(self._async_run(key, entry))
+
+    async def _async_run(self, key, entry):
+        """Run one update under the concurrency limit."""
+        try:
+            async with self._semaphore:
+                await entry.update()
+        except Exception as err:  # pylint: disable=broad-except
+            _LOGGER.error("Periodic update of %s failed: %s", key, err, exc_info=err)
+        finally:
+            entry.running = False
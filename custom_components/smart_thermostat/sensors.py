@@ -0,0 +1,202 @@
+"""Incremental temperature sensor aggregation for the Smart Thermostat."""
+import heapq
+import logging
+
+from .anomaly import AnomalyDetector
+from .fusion import RobustFusion
+
+_LOGGER = logging.getLogger(__name__)
+
+SENSOR_FRESHNESS = 300  # Seconds before a reading is considered stale
+STALE_INTERVALS = 3  # Learned report intervals a sensor may miss before it is dropped
+INVALID_STATES = ("unknown", "unavailable")
+
+
+def parse_temperature(state):
+    """Return the numeric temperature of a sensor state, or None if unusable."""
+    if state is None or state.state in INVALID_STATES:
+        return None
+    try:
+        return float(state.state)
+    except (TypeError, ValueError):
+        return None
+
+
+class SensorAggregator:
+    """Cache the latest reading per sensor and fuse them into one temperature.
+
+    Readings are pushed in from state change events, so the control
+    temperature never rescans the state machine; the same events feed a robust
+    fusion stage that produces it. A sensor is only dropped once it has been
+    silent for its freshness window or STALE_INTERVALS of its learned report interval, whichever is longer; before
+    that the fusion already discounts it as its estimate ages. Sensors the
+    anomaly detector flags as stuck or drifting stay cached but are left out
+    of the fusion until they recover.
+    """
+
+    def __init__(self, sensor_ids, freshness=SENSOR_FRESHNESS, weights=None):
+        self._sensor_ids = set(sensor_ids)
+        # Freshness is either one window for every sensor or a per-sensor mapping
+        if isinstance(freshness, dict):
+            self._freshness = dict(freshness)
+            self._default_freshness = SENSOR_FRESHNESS
+        else:
+            self._freshness = {}
+            self._default_freshness = freshness
+        self._readings = {}  # sensor_id -> temperature
+        self._updated = {}  # sensor_id -> timestamp (epoch seconds)
+        # Min-heap of (deadline, sensor_id, timestamp); superseded entries are
+        # skipped lazily when they reach the top
+        self._deadlines = []
+        self._fusion = RobustFusion(weights)
+        self._detector = AnomalyDetector()
+        self._clock = 0.0  # Latest timestamp seen, for removals without one
+        self.version = 0
+
+    @property
+    def readings(self):
+        """Return the live sensor_id -> temperature mapping (do not mutate)."""
+        return self._readings
+
+    @property
+    def temperature(self):
+        """Return the fused control temperature, or None when empty."""
+        return self._fusion.value
+
+    @property
+    def outliers(self):
+        """Return the sensors currently rejected as outliers."""
+        return self._fusion.outliers
+
+    @property
+    def flags(self):
+        """Return the live sensor_id -> "stuck"/"drifting" mapping (do not mutate)."""
+        return self._detector.flags
+
+    def zone_temperature(self, sensor_ids):
+        """Return the mean filtered temperature of some sensors, or None if none is usable.
+
+        Sensors that are stale, flagged or rejected as outliers are left out.
+        """
+        smoothed = self._fusion.smoothed
+        outliers = self._fusion.outliers
+        values = [
+            smoothed[sensor_id] for sensor_id in sensor_ids
+            if sensor_id in smoothed and sensor_id not in outliers
+        ]
+        if not values:
+            return None
+        return sum(values) / len(values)
+
+    def refresh(self, now):
+        """Return the control temperature re-weighted for the sensors' ages.
+
+        A stuck sensor sends no events, so flat lines are also judged here.
+        """
+        self._clock = max(self._clock, now)
+        old = self._fusion.value
+        flags_version = self._detector.version
+        # Readings that already expired are judged too: a sensor repeating
+        # itself goes quiet and drops out long before STUCK_DURATION
+        for sensor_id in self._detector.flat_lines():
+            included = sensor_id in self._fusion
+            if len(self._fusion) - included < 2:
+                continue
+            reference = self._fusion.value_without(sensor_id, now)
+            if self._detector.check_stuck(sensor_id, reference, now) and included:
+                self._fusion.exclude(sensor_id, now)
+        if self._fusion.refresh(now) != old or self._detector.version != flags_version:
+            self.version += 1
+        return self._fusion.value
+
+    def confidence(self, now):
+        """Return each sensor's estimate standard deviation and report interval."""
+        result = {}
+        for sensor_id in self._readings:
+            variance = self._fusion.variance(sensor_id, now)
+            interval = self._fusion.interval(sensor_id)
+            result[sensor_id] = {
+                "std": None if variance is None else round(variance ** 0.5, 2),
+                "interval": None if interval is None else round(interval),
+            }
+        return result
+
+    def __len__(self):
+        return len(self._readings)
+
+    def update(self, sensor_id, value, timestamp):
+        """Store a reading; a value of None drops the sensor."""
+        if sensor_id not in self._sensor_ids:
+            return False
+        if value is None:
+            return self.remove(sensor_id)
+
+        # Judge the report against the other sensors, if there are enough of
+        # them; its own estimate would pull the reference towards it
+        others = len(self._fusion) - (sensor_id in self._fusion)
+        reference = self._fusion.value_without(sensor_id, timestamp) if others >= 2 else None
+        flags_version = self._detector.version
+        flagged = self._detector.check(sensor_id, value, reference, timestamp) is not None
+
+        old = self._readings.get(sensor_id)
+        self._readings[sensor_id] = value
+        self._updated[sensor_id] = timestamp
+        self._clock = max(self._clock, timestamp)
+        self._fusion.update(sensor_id, value, timestamp, include=not flagged)
+        heapq.heappush(
+            self._deadlines,
+            (timestamp + self.stale_after(sensor_id), sensor_id, timestamp)
+        )
+        changed = old != value or self._detector.version != flags_version
+        if changed:
+            self.version += 1
+        return changed
+
+    def remove(self, sensor_id, now=None, keep_flat=False):
+        """Drop a sensor, returning True if it was present.
+
+        keep_flat keeps judging a sensor that only went quiet for a flat line.
+        """
+        old = self._readings.pop(sensor_id, None)
+        self._updated.pop(sensor_id, None)
+        if old is None:
+            return False
+        self._fusion.remove(sensor_id, self._clock if now is None else now)
+        self._detector.reset(sensor_id, keep_flat)
+        if not self._readings:
+            self._deadlines.clear()
+        self.version += 1
+        return True
+
+    def freshness(self, sensor_id):
+        """Return the freshness window in seconds for a sensor."""
+        return self._freshness.get(sensor_id, self._default_freshness)
+
+    def stale_after(self, sensor_id):
+        """Return the seconds of silence after which a sensor is dropped."""
+        freshness = self.freshness(sensor_id)
+        interval = self._fusion.interval(sensor_id)
+        if interval is None:
+            return freshness
+        return max(freshness, STALE_INTERVALS * interval)
+
+    def next_deadline(self):
+        """Return the timestamp at which the next reading goes stale, if any."""
+        deadlines = self._deadlines
+        while deadlines:
+            deadline, sensor_id, timestamp = deadlines[0]
+            if self._updated.get(sensor_id) == timestamp:
+                return deadline
+            heapq.heappop(deadlines)
+        return None
+
+    def expire(self, now):
+        """Drop readings whose freshness deadline has passed and return their ids."""
+        stale = []
+        deadline = self.next_deadline()
+        while deadline is not None and deadline <= now:
+            _, sensor_id, _ = heapq.heappop(self._deadlines)
+            self.remove(sensor_id, now, keep_flat=True)
+            stale.append(sensor_id)
+            deadline = self.next_deadline()
+        return stale
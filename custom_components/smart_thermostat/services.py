@@ -0,0 +1,127 @@
+"""Domain services for the Smart Thermostat, routed through an entity index."""
+import asyncio
+import logging
+
+from homeassistant.const import ATTR_ENTITY_ID, ENTITY_MATCH_ALL
+from homeassistant.core import callback
+import homeassistant.helpers.config_validation as cv
+import voluptuous as vol
+
+from .const import DOMAIN
+
+_LOGGER = logging.getLogger(__name__)
+
+DATA_ROUTER = "smart_thermostat_router"
+
+SERVICE_TURN_ON = "turn_on"
+SERVICE_TURN_OFF = "turn_off"
+SERVICE_FORCE_MODE = "force_mode"
+ATTR_FORCE_MODE = "force_mode"
+
+SERVICE_SCHEMA = vol.Schema({vol.Required(ATTR_ENTITY_ID): cv.comp_entity_ids})
+FORCE_MODE_SCHEMA = SERVICE_SCHEMA.extend({
+    vol.Optional(ATTR_FORCE_MODE): vol.Any(None, vol.In(["heat_pump", "furnace"])),
+})
+
+
+@callback
+def async_get_router(hass):
+    """Return the service router, registering the domain services on first use."""
+    router = hass.data.get(DATA_ROUTER)
+    if router is None:
+        router = hass.data[DATA_ROUTER] = ServiceRouter(hass)
+        router.async_register_services()
+    return router
+
+
+class ServiceRouter:
+    """Dispatch domain service calls to thermostats by entity_id.
+
+    Thermostats add themselves when added to Home Assistant and are removed
+    with the entity, so finding the targets of a call is one dict lookup per
+    entity. A call naming several thermostats (or "all") runs them
+    concurrently.
+    """
+
+    def __init__(self, hass):
+        self._hass = hass
+        self._thermostats = {}  # entity_id -> SmartThermostat
+
+    def __len__(self):
+        return len(self._thermostats)
+
+    def get(self, entity_id):
+        """Return the thermostat for an entity_id, or None."""
+        return self._thermostats.get(entity_id)
+
+    @callback
+    def async_add(self, thermostat):
+        """Index a thermostat by its entity_id and return a callback to remove it."""
+        entity_id = thermostat.entity_id
+        self._thermostats[entity_id] = thermostat
+
+        @callback
+        def async_remove():
+            if self._thermostats.get(entity_id) is thermostat:
+                del self._thermostats[entity_id]
+
+        return async_remove
+
+    @callback
+    def async_register_services(self):
+        """Register the domain services once for every thermostat."""
+        services = self._hass.services
+        services.async_register(DOMAIN, SERVICE_TURN_ON, self._async_turn_on, schema=SERVICE_SCHEMA)
+        services.async_register(DOMAIN, SERVICE_TURN_OFF, self._async_turn_off, schema=SERVICE_SCHEMA)
+        services.async_register(
+            DOMAIN, SERVICE_FORCE_MODE, self._async_force_mode, schema=FORCE_MODE_SCHEMA
+        )
+
+    def targets(self, entity_ids):
+        """Return the thermostats a call addresses, raising if any is unknown."""
+        if entity_ids == ENTITY_MATCH_ALL or ENTITY_MATCH_ALL in entity_ids:
+            return list(self._thermostats.values())
+        if isinstance(entity_ids, str):
+            entity_ids = [entity_ids]
+        missing = [entity_id for entity_id in entity_ids if entity_id not in self._thermostats]
+        if missing:
+            raise ValueError(f"Thermostat {', '.join(missing)} not found in component")
+        return [self._thermostats[entity_id] for entity_id in entity_ids]
+
+    async def async_dispatch(self, entity_ids, action):
+        """Run action on every targeted thermostat at once.
+
+        Every target runs even if another fails; the first error is raised
+        once all are done.
+        """
+        thermostats = self.targets(entity_ids)
+        results = await asyncio.gather(
+            *(action(thermostat) for thermostat in thermostats), return_exceptions=True
+        )
+        error = None
+        for thermostat, result in zip(thermostats, results):
+            if isinstance(result, Exception):
+                _LOGGER.error("Service call failed for %s: %s", thermostat.entity_id, result)
+                error = error or result
+        if error is not None:
+            raise error
+
+    async def _async_turn_on(self, call):
+        """Handle smart_thermostat.turn_on."""
+        await self.async_dispatch(
+            call.data[ATTR_ENTITY_ID], lambda thermostat: thermostat.async_turn_on()
+        )
+
+    async def _async_turn_off(self, call):
+        """Handle smart_thermostat.turn_off."""
+        await self.async_dispatch(
+            call.data[ATTR_ENTITY_ID], lambda thermostat: thermostat.async_turn_off()
+        )
+
+    async def _async_force_mode(self, call):
+        """Handle smart_thermostat.force_mode."""
+        force_mode = call.data.get(ATTR_FORCE_MODE)
+        await self.async_dispatch(
+            call.data[ATTR_ENTITY_ID],
+            lambda thermostat: thermostat.async_force_heat_source(force_mode),
+        )
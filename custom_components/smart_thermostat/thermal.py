@@ -0,0 +1,249 @@
+"""Online thermal model of the house for the Smart Thermostat."""
+import math
+
+THERMAL_FORGETTING = 0.99  # Weight kept by older samples on each update
+THERMAL_SAMPLE_INTERVAL = 120  # Minimum seconds between samples used for a slope
+THERMAL_MAX_GAP = 1800  # Seconds after which the previous sample is too old to use
+THERMAL_MIN_UPDATES = 6  # Heating updates before predictions are trusted
+DEAD_RECKONING_VALIDITY = 1800  # Seconds an estimate without sensors is trusted
+RECENT_RATE_SMOOTHING = 0.3  # Weight of the newest slope in the recent rate
+_INITIAL_COVARIANCE = 100.0  # Large prior uncertainty so the first cycles dominate
+
+
+class ThermalModel:
+    """Recursive least squares fit of a first-order house model.
+
+    The indoor temperature is modelled as
+
+        dT/dt = heating_rate * u - loss * (T - T_outdoor)
+
+    with u = 1 while the heat source burns and rates in °C per hour. Each update
+    is a constant-time 2x2 RLS step, cheap enough to run on every sample.
+    """
+
+    __slots__ = ("heating_rate", "loss", "updates", "heating_updates", "_p", "_forgetting")
+
+    def __init__(self, forgetting=THERMAL_FORGETTING):
+        self.heating_rate = 0.0
+        self.loss = 0.0
+        self.updates = 0
+        self.heating_updates = 0
+        # Covariance [[p00, p01], [p01, p11]] stored as a flat symmetric triple
+        self._p = [_INITIAL_COVARIANCE, 0.0, _INITIAL_COVARIANCE]
+        self._forgetting = forgetting
+
+    @property
+    def ready(self):
+        """Return True once the fit is good enough to predict burn times."""
+        return (
+            self.heating_updates >= THERMAL_MIN_UPDATES
+            and self.heating_rate > 0
+            and self.loss >= 0
+        )
+
+    def update(self, heating, indoor, outdoor, rate):
+        """Fold one observed temperature slope (°C per hour) into the fit."""
+        x0 = 1.0 if heating else 0.0
+        x1 = -(indoor - outdoor)
+        p00, p01, p11 = self._p
+        lam = self._forgetting
+
+        # P x and the gain K = P x / (lambda + x' P x)
+        px0 = p00 * x0 + p01 * x1
+        px1 = p01 * x0 + p11 * x1
+        denom = lam + x0 * px0 + x1 * px1
+        k0 = px0 / denom
+        k1 = px1 / denom
+
+        error = rate - (self.heating_rate * x0 + self.loss * x1)
+        self.heating_rate += k0 * error
+        self.loss += k1 * error
+
+        # P = (P - K (P x)') / lambda
+        self._p = [
+            (p00 - k0 * px0) / lam,
+            (p01 - k0 * px1) / lam,
+            (p11 - k1 * px1) / lam,
+        ]
+        self.updates += 1
+        if heating:
+            self.heating_updates += 1
+
+    def time_to_reach(self, indoor, outdoor, target):
+        """Return the seconds of heating needed to reach target, or None."""
+        if indoor >= target:
+            return 0.0
+        if self.heating_rate <= 0:
+            return None
+        if self.loss <= 1e-6:
+            # No measurable loss: the house warms at a constant rate
+            return (target - indoor) / self.heating_rate * 3600
+
+        # Exponential approach to the temperature the source can hold
+        equilibrium = self.heating_rate / self.loss  # Above outdoor
+        start = indoor - outdoor
+        goal = target - outdoor
+        if equilibrium <= goal:
+            return None  # The source can't get there at this outdoor temperature
+        hours = math.log((equilibrium - start) / (equilibrium - goal)) / self.loss
+        return hours * 3600
+
+    def as_dict(self):
+        """Return the fit as a plain dict for storage."""
+        return {
+            "heating_rate": self.heating_rate,
+            "loss": self.loss,
+            "updates": self.updates,
+            "heating_updates": self.heating_updates,
+            "covariance": list(self._p),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a fit saved with as_dict."""
+        model = cls()
+        model.heating_rate = data.get("heating_rate", 0.0)
+        model.loss = data.get("loss", 0.0)
+        model.updates = data.get("updates", 0)
+        model.heating_updates = data.get("heating_updates", 0)
+        covariance = data.get("covariance")
+        if covariance and len(covariance) == 3:
+            model._p = [float(value) for value in covariance]
+        return model
+
+
+class ThermalEstimator:
+    """Feed the indoor temperature stream into one thermal model per heat source.
+
+    Slopes are taken between samples at least THERMAL_SAMPLE_INTERVAL apart and
+    never across a change of heat source or burner state, so each update sees a
+    single operating regime.
+    """
+
+    def __init__(self, sample_interval=THERMAL_SAMPLE_INTERVAL):
+        self._sample_interval = sample_interval
+        self.models = {}  # source -> ThermalModel
+        self._last = None  # (timestamp, indoor, source, heating)
+        self.version = 0
+
+    def model(self, source):
+        """Return the model for a heat source, creating it if needed."""
+        model = self.models.get(source)
+        if model is None:
+            model = self.models[source] = ThermalModel()
+        return model
+
+    def add_sample(self, timestamp, indoor, outdoor, source, heating):
+        """Record a temperature sample, returning True if the model was updated.
+
+        heating is whether the source is delivering heat, or None when that
+        isn't known; such samples are skipped rather than guessed.
+        """
+        if indoor is None or outdoor is None or source is None or heating is None:
+            self._last = None
+            return False
+
+        last = self._last
+        if last is None or last[2] != source or last[3] != heating:
+            self._last = (timestamp, indoor, source, heating)
+            return False
+
+        elapsed = timestamp - last[0]
+        if elapsed < self._sample_interval:
+            return False
+        self._last = (timestamp, indoor, source, heating)
+        if elapsed > THERMAL_MAX_GAP:
+            return False
+
+        rate = (indoor - last[1]) / elapsed * 3600
+        self.model(source).update(heating, (indoor + last[1]) / 2, outdoor, rate)
+        self.version += 1
+        return True
+
+    def as_dict(self):
+        """Return every model as a plain dict for storage."""
+        return {source: model.as_dict() for source, model in self.models.items()}
+
+    def load(self, data):
+        """Restore models saved with as_dict."""
+        self.models = {
+            source: ThermalModel.from_dict(model) for source, model in (data or {}).items()
+        }
+
+
+class DeadReckoning:
+    """Project the last measured indoor temperature forward without sensors.
+
+    While sensors report, observe() anchors the estimate and keeps a smoothed
+    recent slope. Once they go quiet, advance() integrates the thermal model of
+    the active source (or the recent slope while the model is still learning)
+    in steps, so burner changes during the outage are followed. Confidence
+    falls linearly to zero over the validity window, after which there is no
+    estimate at all.
+    """
+
+    def __init__(self, validity=DEAD_RECKONING_VALIDITY):
+        self._validity = validity
+        self._measured_at = None  # Timestamp of the last real measurement
+        self._estimate = None
+        self._estimated_at = None
+        self._last = None  # (timestamp, temperature, heating) for the recent slope
+        self._rate = None  # Recent slope in °C per hour
+        self._rate_heating = None  # Burner state the slope was measured in
+
+    @property
+    def valid_until(self):
+        """Return the timestamp after which no estimate is given, if any."""
+        if self._measured_at is None:
+            return None
+        return self._measured_at + self._validity
+
+    def observe(self, timestamp, temperature, heating):
+        """Anchor the estimate to a measured temperature."""
+        last = self._last
+        if last is not None and last[2] == heating and timestamp - last[0] >= THERMAL_SAMPLE_INTERVAL:
+            rate = (temperature - last[1]) / (timestamp - last[0]) * 3600
+            if self._rate is None or self._rate_heating != heating:
+                self._rate = rate
+            else:
+                self._rate += RECENT_RATE_SMOOTHING * (rate - self._rate)
+            self._rate_heating = heating
+            self._last = (timestamp, temperature, heating)
+        elif last is None or last[2] != heating:
+            self._last = (timestamp, temperature, heating)
+        self._measured_at = timestamp
+        self._estimate = temperature
+        self._estimated_at = timestamp
+
+    def advance(self, now, model=None, outdoor=None, heating=False, ceiling=None):
+        """Return (temperature, confidence) projected to now, or None once expired.
+
+        ceiling caps the projection while heating, e.g. at the setpoint a heat
+        source regulates to. heating is None when the delivered heat isn't
+        known, in which case only a recent slope measured that way is used.
+        """
+        if self._estimate is None:
+            return None
+        age = now - self._measured_at
+        if age > self._validity:
+            return None
+
+        hours = (now - self._estimated_at) / 3600
+        if hours > 0:
+            start = self._estimate
+            if model is not None and model.ready and outdoor is not None and heating is not None:
+                drive = model.heating_rate if heating else 0.0
+                if model.loss > 1e-6:
+                    equilibrium = outdoor + drive / model.loss
+                    estimate = equilibrium + (start - equilibrium) * math.exp(-model.loss * hours)
+                else:
+                    estimate = start + drive * hours
+            elif self._rate is not None and self._rate_heating == heating:
+                estimate = start + self._rate * hours
+            else:
+                estimate = start  # Nothing to go on for this burner state; hold
+            if heating and ceiling is not None and estimate > ceiling:
+                estimate = max(start, ceiling)
+            self._estimate = estimate
+            self._estimated_at = now
+        return self._estimate, max(0.0, 1.0 - age / self._validity)
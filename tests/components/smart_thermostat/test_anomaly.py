@@ -0,0 +1,83 @@
+"""Test the Smart Thermostat stuck and drifting sensor detection."""
+from custom_components.smart_thermostat.anomaly import (
+    DRIFTING,
+    STUCK,
+    STUCK_DURATION,
+    AnomalyDetector,
+)
+
+REPORT_INTERVAL = 60  # Seconds between reports in these tests
+
+
+def test_stuck_sensor_flagged_and_recovers():
+    """Test a flat line is flagged only once the other sensors have moved."""
+    detector = AnomalyDetector()
+    timestamp = 1000.0
+    while timestamp < 1000.0 + STUCK_DURATION + 300:
+        assert detector.check("sensor.bedroom", 20.0, 20.2, timestamp) is None
+        timestamp += REPORT_INTERVAL
+
+    # The house warms up while the sensor keeps repeating itself
+    reference = 20.2
+    for report in range(10):
+        reference += 0.1
+        flag = detector.check("sensor.bedroom", 20.0, reference, timestamp)
+        timestamp += REPORT_INTERVAL
+    assert flag == STUCK
+    assert detector.flags == {"sensor.bedroom": STUCK}
+
+    assert detector.check("sensor.bedroom", 21.1, reference, timestamp) is None
+    assert not detector.flags
+
+
+def test_silent_stuck_sensor_flagged_between_reports():
+    """Test a sensor that stops sending events is judged from its last change."""
+    detector = AnomalyDetector()
+    detector.check("sensor.bedroom", 20.0, 20.0, 1000.0)
+
+    # Home Assistant fires nothing while the value stays the same
+    assert detector.check_stuck("sensor.bedroom", 21.0, 1000.0 + STUCK_DURATION / 2) is False
+    assert detector.check_stuck("sensor.bedroom", 20.2, 1000.0 + STUCK_DURATION) is False
+    assert detector.check_stuck("sensor.bedroom", 21.0, 1000.0 + STUCK_DURATION) is True
+    assert detector.flags == {"sensor.bedroom": STUCK}
+
+
+def test_drifting_sensor_flagged_with_hysteresis():
+    """Test a slow departure from the usual offset is flagged and clears again."""
+    detector = AnomalyDetector()
+    timestamp = 1000.0
+    # The office normally reads half a degree warm, with a little noise
+    for report in range(60):
+        offset = 0.5 + (0.05 if report % 2 else -0.05)
+        assert detector.check("sensor.office", 20.0 + offset, 20.0, timestamp) is None
+        timestamp += REPORT_INTERVAL
+
+    flag = None
+    drift = 0.5
+    while flag is None and drift < 5.0:
+        drift += 0.02
+        flag = detector.check("sensor.office", 20.0 + drift, 20.0, timestamp)
+        timestamp += REPORT_INTERVAL
+    assert flag == DRIFTING
+    assert drift < 2.5
+
+    # Coming back part of the way isn't enough to clear the flag
+    for report in range(40):
+        wobble = 0.01 if report % 2 else 0.0
+        detector.check("sensor.office", 20.0 + drift - 0.4 + wobble, 20.0, timestamp)
+        timestamp += REPORT_INTERVAL
+    assert detector.flags == {"sensor.office": DRIFTING}
+    for report in range(100):
+        wobble = 0.01 if report % 2 else 0.0
+        flag = detector.check("sensor.office", 20.5 + wobble, 20.0, timestamp)
+        timestamp += REPORT_INTERVAL
+    assert flag is None
+
+
+def test_no_reference_no_flags():
+    """Test a lone sensor is never judged."""
+    detector = AnomalyDetector()
+    for report in range(100):
+        assert detector.check(
+            "sensor.bedroom", 20.0 + report * 0.1, None, 1000.0 + report * REPORT_INTERVAL
+        ) is None
@@ -0,0 +1,149 @@
+"""Test the Smart Thermostat command dispatcher."""
+import asyncio
+from unittest.mock import patch
+
+import pytest
+from homeassistant.core import HomeAssistant
+
+from custom_components.smart_thermostat.commands import CommandDispatcher, Reconciler
+
+DEAF_DEVICE = "climate.basement_hp"  # Never reflects the commands it is sent
+
+
+@pytest.fixture
+async def climate_calls(hass: HomeAssistant):
+    """Record climate service calls."""
+    calls = []
+
+    async def record(call):
+        entity_id = call.data["entity_id"]
+        calls.append((entity_id, call.service, dict(call.data)))
+        if entity_id == DEAF_DEVICE:
+            return
+
+        # Reflect the command in the device state like a real device would
+        state = hass.states.get(entity_id)
+        attributes = dict(state.attributes) if state else {}
+        if call.service == "set_hvac_mode":
+            hass.states.async_set(entity_id, call.data["hvac_mode"], attributes)
+        else:
+            attributes["temperature"] = call.data["temperature"]
+            hass.states.async_set(entity_id, state.state if state else "off", attributes)
+
+    hass.services.async_register("climate", "set_hvac_mode", record)
+    hass.services.async_register("climate", "set_temperature", record)
+    return calls
+
+
+@pytest.mark.asyncio
+async def test_superseded_command_is_coalesced(hass, climate_calls):
+    """Test a newer command of the same type replaces a pending one."""
+    dispatcher = CommandDispatcher(hass, 0.05)
+
+    results = await asyncio.gather(
+        dispatcher.async_send("climate.primary_hp", "set_hvac_mode", {"hvac_mode": "heat"}),
+        dispatcher.async_send("climate.primary_hp", "set_temperature", {"temperature": 20}),
+        dispatcher.async_send("climate.primary_hp", "set_temperature", {"temperature": 22}),
+    )
+    await hass.async_block_till_done()
+
+    # Both set_temperature waiters resolve once the surviving command is confirmed
+    assert results == [True, True, True]
+    assert [call[1] for call in climate_calls] == ["set_hvac_mode", "set_temperature"]
+    assert climate_calls[1][2]["temperature"] == 22
+
+
+@pytest.mark.asyncio
+async def test_devices_drain_concurrently(hass, climate_calls):
+    """Test a paced device does not hold up commands to another device."""
+    dispatcher = CommandDispatcher(hass, 1.0)
+
+    dispatcher.async_send("climate.primary_hp", "set_hvac_mode", {"hvac_mode": "heat"})
+    slow = dispatcher.async_send("climate.primary_hp", "set_temperature", {"temperature": 22})
+    fast = dispatcher.async_send("climate.thermostat", "set_hvac_mode", {"hvac_mode": "off"})
+
+    await asyncio.wait_for(fast, 0.5)
+    assert not slow.done()
+    await slow
+
+
+@pytest.mark.asyncio
+async def test_controllers_drain_in_parallel(hass, climate_calls):
+    """Test devices on one controller are paced while other controllers send at once."""
+    dispatcher = CommandDispatcher(hass, 1.0, controllers={
+        "climate.primary_hp": "remote.broadlink_primary",
+        "climate.bedroom_hp": "remote.broadlink_bedroom",
+        "climate.guest_hp": "remote.broadlink_bedroom",
+    })
+    mode = {"hvac_mode": "heat"}
+
+    primary = dispatcher.async_send("climate.primary_hp", "set_hvac_mode", mode)
+    bedroom = dispatcher.async_send("climate.bedroom_hp", "set_hvac_mode", mode)
+    guest = dispatcher.async_send("climate.guest_hp", "set_hvac_mode", mode)
+
+    # One round-trip for the first device on each blaster
+    await asyncio.wait_for(asyncio.gather(primary, bedroom), 0.5)
+    assert not guest.done()
+    assert await guest is True
+    assert set(dispatcher.stats) == {"climate.primary_hp", "climate.bedroom_hp", "climate.guest_hp"}
+
+
+@pytest.mark.asyncio
+async def test_reconciler_sends_only_the_difference(hass, climate_calls):
+    """Test the reconciler skips fields the device already reflects."""
+    hass.states.async_set("climate.primary_hp", "heat", {"temperature": 17})
+    reconciler = Reconciler(hass, CommandDispatcher(hass, 0), settle_time=60)
+
+    commands = await reconciler.async_apply(
+        "climate.primary_hp", hvac_mode="heat", temperature=22
+    )
+    assert commands == [("set_temperature", {"temperature": 22})]
+
+    # Still in flight: not sent again until the settle time passes
+    assert await reconciler.async_reconcile("climate.primary_hp") == []
+
+
+@pytest.mark.asyncio
+async def test_reconciler_reapplies_after_manual_change(hass, climate_calls):
+    """Test drift from the desired state is corrected."""
+    hass.states.async_set("climate.thermostat", "heat", {"temperature": 25})
+    reconciler = Reconciler(hass, CommandDispatcher(hass, 0), settle_time=60)
+    assert await reconciler.async_apply("climate.thermostat", hvac_mode="heat") == []
+
+    # Someone turns the furnace off by hand
+    hass.states.async_set("climate.thermostat", "off", {"temperature": 25})
+    assert await reconciler.async_reconcile("climate.thermostat") == [
+        ("set_hvac_mode", {"hvac_mode": "heat"})
+    ]
+
+
+@pytest.mark.asyncio
+async def test_command_confirmed_by_state_change(hass, climate_calls):
+    """Test a command resolves once the device state reflects it."""
+    hass.states.async_set("climate.primary_hp", "off")
+    dispatcher = CommandDispatcher(hass, 0, timeout=1)
+
+    assert await dispatcher.async_send(
+        "climate.primary_hp", "set_hvac_mode", {"hvac_mode": "heat"}
+    ) is True
+    assert dispatcher.stats["climate.primary_hp"].as_dict() == {
+        "sent": 1, "confirmed": 1, "retried": 0, "lost": 0
+    }
+
+
+@pytest.mark.asyncio
+async def test_unconfirmed_command_retried_then_lost(hass, climate_calls):
+    """Test a device that never reflects a command gets retries, then a lost count."""
+    hass.states.async_set(DEAF_DEVICE, "off")
+    dispatcher = CommandDispatcher(hass, 0, timeout=0.05)
+
+    with patch("custom_components.smart_thermostat.commands.RETRY_BACKOFF", 0):
+        confirmed = await dispatcher.async_send(
+            DEAF_DEVICE, "set_hvac_mode", {"hvac_mode": "heat"}
+        )
+
+    assert confirmed is False
+    assert len(climate_calls) == 3
+    assert dispatcher.stats[DEAF_DEVICE].as_dict() == {
+        "sent": 3, "confirmed": 0, "retried": 2, "lost": 1
+    }
@@ -0,0 +1,61 @@
+"""Test the Smart Thermostat learned duration table."""
+from custom_components.smart_thermostat.durations import DurationTable
+
+
+def test_buckets_learn_independently():
+    """Test learning in a cold snap leaves mild-weather buckets alone."""
+    table = DurationTable(bucket_size=5)
+    mild = table.index(3.0)
+    cold = table.index(-18.0)
+
+    table.set(mild, 300)
+    table.set(cold, 900)
+    assert dict(table.learned()) == {mild: 300, cold: 900}
+    assert table.index(4.9) == mild
+
+
+def test_lookup_borrows_nearest_bucket():
+    """Test an unlearned bucket starts from the nearest learned one."""
+    table = DurationTable(bucket_size=5)
+    assert table.lookup(table.index(0.0), 420) == 420
+
+    table.set(table.index(-12.0), 600)
+    assert table.lookup(table.index(-7.0), 420) == 600
+    assert table.index(-7.0) not in dict(table.learned())
+
+
+def test_out_of_range_readings_clamp():
+    """Test readings beyond the table share the edge buckets."""
+    table = DurationTable(bucket_size=5, min_temp=-30, max_temp=20)
+    assert table.index(-45.0) == table.index(-30.0)
+    assert table.index(35.0) == table.index(19.0)
+
+
+def test_time_of_day_buckets():
+    """Test night and day are learned separately when enabled."""
+    table = DurationTable(bucket_size=5, time_of_day_buckets=4)
+    night = table.index(-5.0, hour=2)
+    afternoon = table.index(-5.0, hour=14)
+    assert night != afternoon
+    assert table.label(afternoon) == "-5..0°C 12-18h"
+
+    # Five buckets don't divide the day evenly; labels follow the real boundaries
+    table = DurationTable(bucket_size=5, time_of_day_buckets=5)
+    labels = {table.label(table.index(-5.0, hour)) for hour in range(24)}
+    assert labels == {
+        "-5..0°C 00-05h", "-5..0°C 05-10h", "-5..0°C 10-15h", "-5..0°C 15-20h", "-5..0°C 20-24h",
+    }
+    for hour in range(24):
+        start, end = table.label(table.index(-5.0, hour)).split()[1].rstrip("h").split("-")
+        assert int(start) <= hour < int(end)
+
+
+def test_round_trip():
+    """Test the table survives storage and rejects a reshaped one."""
+    table = DurationTable()
+    table.set(table.index(-2.0), 480)
+
+    restored = DurationTable()
+    assert restored.load(table.as_list())
+    assert list(restored.learned()) == list(table.learned())
+    assert not DurationTable(bucket_size=2).load(table.as_list())
@@ -0,0 +1,57 @@
+"""Test the Smart Thermostat heat source economics."""
+import pytest
+
+from custom_components.smart_thermostat.economics import EnergyEconomics, parse_cop_curve
+
+COP_CURVE = {-20: 1.5, 0: 2.5, 10: 4.0}
+
+
+def test_costs_follow_cop_curve():
+    """Test heat pump cost per kWh delivered is price over interpolated COP."""
+    economics = EnergyEconomics(COP_CURVE, electricity_price=0.20, gas_price=0.06,
+                                furnace_efficiency=0.9)
+    assert economics.heat_pump_cost(0.0) == pytest.approx(0.20 / 2.5)
+    assert economics.heat_pump_cost(5.0) == pytest.approx(0.20 / 3.25)
+    assert economics.heat_pump_cost(2.3) == pytest.approx(0.20 / (2.5 + 0.23 * 1.5), rel=1e-3)
+    assert economics.furnace_cost == pytest.approx(0.06 / 0.9)
+
+
+def test_break_even_moves_with_prices():
+    """Test the crossover moves with energy prices."""
+    economics = EnergyEconomics(COP_CURVE, electricity_price=0.20, gas_price=0.06,
+                                furnace_efficiency=0.9)
+    # COP 3.0 breaks even: a third of the way from 0°C to 10°C
+    assert economics.break_even == pytest.approx(10 / 3, abs=0.05)
+    assert economics.heat_pump_cost(-5.0) > economics.furnace_cost
+    assert economics.heat_pump_cost(8.0) < economics.furnace_cost
+
+    cheap_power = EnergyEconomics(COP_CURVE, electricity_price=0.15, gas_price=0.06,
+                                  furnace_efficiency=0.9)
+    assert cheap_power.break_even < economics.break_even
+
+
+def test_out_of_range_and_no_crossover():
+    """Test lookups clamp to the grid and a one-sided market has no break-even."""
+    economics = EnergyEconomics(COP_CURVE, electricity_price=0.01)
+    assert economics.break_even is None
+    assert economics.heat_pump_cost(-60.0) == economics.heat_pump_cost(-40.0)
+    assert economics.heat_pump_cost(45.0) == economics.heat_pump_cost(30.0)
+
+
+def test_break_even_with_uneven_cop_curve():
+    """Test a COP curve that crosses the furnace cost more than once."""
+    # Cheaper only in the cold: there is no temperature above which it wins
+    cold_only = EnergyEconomics({-20: 4.0, 0: 1.5, 10: 1.5})
+    assert cold_only.break_even is None
+
+    # Cheap, then dear, then cheap again: the last crossing is the break-even
+    dip = EnergyEconomics({-20: 4.0, -10: 1.5, 0: 1.5, 10: 4.0})
+    assert 0 < dip.break_even < 10
+    assert dip.heat_pump_cost(dip.break_even + 1) < dip.furnace_cost
+    assert dip.heat_pump_cost(dip.break_even - 1) > dip.furnace_cost
+
+
+def test_parse_cop_curve():
+    """Test both config forms of the COP curve give sorted points."""
+    assert parse_cop_curve({5: 3.3, -5: 2.4}) == ((-5.0, 2.4), (5.0, 3.3))
+    assert parse_cop_curve([[5, 3.3], [-5, 2.4]]) == ((-5.0, 2.4), (5.0, 3.3))
@@ -0,0 +1,76 @@
+"""Test the Smart Thermostat forecast cache."""
+from datetime import timedelta
+
+import pytest
+from homeassistant.core import HomeAssistant, SupportsResponse
+from homeassistant.util import dt as dt_util
+
+from custom_components.smart_thermostat.forecast import async_get_forecast_cache
+
+WEATHER = "weather.forecast_home"
+
+
+@pytest.fixture
+async def forecast_calls(hass: HomeAssistant):
+    """Serve an hourly forecast falling one degree per hour from 2°C."""
+    calls = []
+    start = dt_util.utcnow().replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+
+    async def get_forecasts(call):
+        calls.append(call.data)
+        return {
+            WEATHER: {
+                "forecast": [
+                    {"datetime": (start + timedelta(hours=hour)).isoformat(), "temperature": 2.0 - hour}
+                    for hour in range(24)
+                ]
+            }
+        }
+
+    hass.services.async_register(
+        "weather", "get_forecasts", get_forecasts, supports_response=SupportsResponse.ONLY
+    )
+    hass.states.async_set(WEATHER, "cloudy", {"temperature": 3.0})
+    return calls, start
+
+
+@pytest.mark.asyncio
+async def test_instances_share_one_fetch(hass, forecast_calls):
+    """Test thermostats on the same weather entity share a cached fetch."""
+    calls, _ = forecast_calls
+    first = async_get_forecast_cache(hass, WEATHER)
+    second = async_get_forecast_cache(hass, WEATHER)
+    assert first is second
+
+    await first.async_refresh()
+    await second.async_refresh()
+    assert len(calls) == 1
+    assert len(first) == 24
+
+
+@pytest.mark.asyncio
+async def test_interpolates_between_points(hass, forecast_calls):
+    """Test temperatures between forecast hours are interpolated."""
+    _, start = forecast_calls
+    cache = async_get_forecast_cache(hass, WEATHER)
+    await cache.async_refresh()
+
+    half_past = (start + timedelta(hours=2, minutes=30)).timestamp()
+    assert cache.temperature_at(half_past) == pytest.approx(-0.5)
+    # Beyond the horizon the last point holds
+    assert cache.temperature_at(cache.horizon + 3600) == pytest.approx(-21.0)
+    # Now is anchored to the current observation
+    assert cache.temperature_at(dt_util.utcnow().timestamp()) == pytest.approx(3.0, abs=0.1)
+
+
+@pytest.mark.asyncio
+async def test_observation_without_forecast(hass):
+    """Test the current observation is used when no forecast is available."""
+    hass.states.async_set(WEATHER, "sunny", {"temperature": -2.0})
+    cache = async_get_forecast_cache(hass, WEATHER)
+    await cache.async_refresh()
+
+    assert len(cache) == 0
+    assert cache.temperature_at(dt_util.utcnow().timestamp()) == -2.0
+    hass.states.async_set(WEATHER, "sunny", {"temperature": -4.0})
+    assert cache.temperature_at(dt_util.utcnow().timestamp()) == -4.0
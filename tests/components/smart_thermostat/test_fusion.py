@@ -0,0 +1,77 @@
+"""Test the Smart Thermostat sensor fusion."""
+import pytest
+
+from custom_components.smart_thermostat.fusion import RobustFusion
+
+
+def test_outlier_rejected():
+    """Test a sensor next to a radiator doesn't drag the control temperature."""
+    fusion = RobustFusion()
+    fusion.update("sensor.bedroom", 20.0, 1000.0)
+    fusion.update("sensor.office", 20.4, 1000.0)
+    fusion.update("sensor.hallway", 19.8, 1000.0)
+    fusion.update("sensor.living_room", 26.0, 1000.0)
+
+    assert fusion.outliers == {"sensor.living_room"}
+    assert fusion.value == pytest.approx((20.0 + 20.4 + 19.8) / 3)
+
+
+def test_small_spread_is_kept():
+    """Test sensors within the minimum deviation are never rejected."""
+    fusion = RobustFusion()
+    for sensor_id, value in (("a", 20.0), ("b", 20.0), ("c", 20.0), ("d", 20.6)):
+        fusion.update(sensor_id, value, 1000.0)
+    assert not fusion.outliers
+    assert fusion.value == pytest.approx(20.15)
+
+
+def test_value_without_leaves_the_sensor_out():
+    """Test the reference for one sensor is fused from the others only."""
+    fusion = RobustFusion()
+    fusion.update("sensor.bedroom", 20.0, 1000.0)
+    fusion.update("sensor.office", 20.4, 1000.0)
+    fusion.update("sensor.hallway", 21.2, 1000.0)
+
+    assert fusion.value == pytest.approx(20.533, abs=0.01)
+    assert fusion.value_without("sensor.hallway", 1000.0) == pytest.approx(20.2)
+    assert RobustFusion().value_without("sensor.hallway", 1000.0) is None
+
+
+def test_window_median_ignores_spike():
+    """Test a single spiking report is absorbed by the sensor's window."""
+    fusion = RobustFusion()
+    fusion.update("sensor.bedroom", 20.0, 1000.0)
+    fusion.update("sensor.bedroom", 20.2, 1060.0)
+    fusion.update("sensor.bedroom", 35.0, 1120.0)
+    assert fusion.value == pytest.approx(20.2, abs=0.1)
+
+
+def test_weights_and_removal():
+    """Test configured weights and that removing a sensor restores the rest."""
+    fusion = RobustFusion(weights={"sensor.office": 3})
+    fusion.update("sensor.bedroom", 20.0, 1000.0)
+    fusion.update("sensor.office", 21.0, 1000.0)
+    assert fusion.value == pytest.approx(20.75)
+
+    fusion.remove("sensor.office", 1000.0)
+    assert fusion.value == 20.0
+    fusion.remove("sensor.bedroom", 1000.0)
+    assert fusion.value is None
+
+
+def test_quiet_sensor_fades_out():
+    """Test a sensor that stops reporting loses weight without a cliff."""
+    fusion = RobustFusion()
+    for tick in range(5):
+        fusion.update("sensor.broadlink", 20.0, 1000.0 + tick * 60)
+        fusion.update("sensor.ecobee", 22.0, 1000.0 + tick * 60)
+    assert fusion.value == pytest.approx(21.0)
+
+    # The Ecobee goes quiet while the Broadlink keeps reporting
+    values = []
+    for tick in range(5, 15):
+        fusion.update("sensor.broadlink", 20.0, 1000.0 + tick * 60)
+        values.append(fusion.value)
+    assert values == sorted(values, reverse=True)
+    assert values[-1] < 20.2
+    assert all(later - earlier > -0.5 for earlier, later in zip(values, values[1:]))
@@ -0,0 +1,40 @@
+"""Test the Smart Thermostat action history."""
+import logging
+
+from custom_components.smart_thermostat.history import ActionHistory
+
+
+def test_entries_formatted_newest_first():
+    """Test events are formatted lazily and returned newest first."""
+    history = ActionHistory(size=3)
+    history.add("Set temperature to %s°C", (21.5,))
+    history.add("Forcing heat source to %s", ("furnace",))
+
+    entries = history.entries()
+    assert entries[0].endswith("Forcing heat source to furnace")
+    assert entries[1].endswith("Set temperature to 21.5°C")
+
+
+def test_ring_overwrites_oldest():
+    """Test the ring keeps only the most recent events."""
+    history = ActionHistory(size=3)
+    for value in range(5):
+        history.add("Event %s", (value,))
+
+    assert len(history) == 3
+    assert [entry.split("] ")[1] for entry in history.entries()] == [
+        "Event 4", "Event 3", "Event 2"
+    ]
+
+
+def test_debug_events_do_not_evict_history():
+    """Test debug chatter is left to the logger and never evicts meaningful events."""
+    history = ActionHistory(size=2)
+    history.add("Started furnace heating cycle")
+    version = history.version
+    for _ in range(10):
+        history.add("Command check", level=logging.DEBUG)
+
+    assert history.version == version
+    assert len(history.entries()) == 1
+    assert len(history) == 1
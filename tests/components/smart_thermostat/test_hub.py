@@ -0,0 +1,43 @@
+"""Test the Smart Thermostat shared sensor hub."""
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.smart_thermostat import hub as hub_module
+from custom_components.smart_thermostat.hub import async_get_sensor_hub
+
+
+@pytest.mark.asyncio
+async def test_state_parsed_once_for_every_thermostat(hass):
+    """Test two zones sharing a sensor cost one parse per change."""
+    hub = async_get_sensor_hub(hass)
+    first, second = [], []
+    unsub_first = hub.async_subscribe(
+        ["sensor.thermostat_current_temperature", "sensor.bedroom_temperature"],
+        lambda *reading: first.append(reading),
+    )
+    unsub_second = hub.async_subscribe(
+        ["sensor.thermostat_current_temperature"], lambda *reading: second.append(reading)
+    )
+
+    with patch.object(
+        hub_module, "parse_temperature", wraps=hub_module.parse_temperature
+    ) as parse:
+        hass.states.async_set("sensor.thermostat_current_temperature", "20.5")
+        await hass.async_block_till_done()
+        assert parse.call_count == 1
+
+    assert first[0][0] == second[0][0] == "sensor.thermostat_current_temperature"
+    assert first[0][2] == second[0][2] == 20.5
+
+    # The second zone leaving doesn't stop the first from hearing the sensor
+    unsub_second()
+    hass.states.async_set("sensor.thermostat_current_temperature", "unavailable")
+    await hass.async_block_till_done()
+    assert first[-1][2] is None
+    assert len(second) == 1
+
+    unsub_first()
+    hass.states.async_set("sensor.thermostat_current_temperature", "21.0")
+    await hass.async_block_till_done()
+    assert len(first) == 2
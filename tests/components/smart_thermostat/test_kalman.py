@@ -0,0 +1,36 @@
+"""Test the Smart Thermostat per-sensor Kalman filter."""
+import pytest
+
+from custom_components.smart_thermostat.kalman import SensorFilter
+
+
+def test_filter_smooths_noise_and_learns_interval():
+    """Test jitter is averaged out and the report interval is learned."""
+    sensor_filter = SensorFilter()
+    for tick, value in enumerate((20.0, 20.2, 19.9, 20.1, 20.0, 19.9, 20.1)):
+        sensor_filter.update(value, 1000.0 + tick * 60)
+
+    assert sensor_filter.estimate == pytest.approx(20.0, abs=0.1)
+    assert sensor_filter.interval == pytest.approx(60.0)
+    assert sensor_filter.variance < 0.02
+
+
+def test_variance_grows_faster_when_overdue():
+    """Test a sensor that misses reports is trusted less than its schedule allows."""
+    fast = SensorFilter()
+    slow = SensorFilter()
+    for tick in range(5):
+        fast.update(20.0, 1000.0 + tick * 60)
+        slow.update(20.0, 1000.0 + tick * 300)
+
+    # Both silent for five minutes: routine for the slow sensor only
+    assert fast.variance_at(fast.updated + 300) > slow.variance_at(slow.updated + 300)
+    assert fast.variance_at(fast.updated + 30) < fast.variance_at(fast.updated + 60)
+
+
+def test_level_change_is_followed():
+    """Test a change far beyond the noise resets the estimate instead of lagging."""
+    sensor_filter = SensorFilter()
+    sensor_filter.update(23.0, 1000.0)
+    sensor_filter.update(19.0, 1001.0)
+    assert sensor_filter.estimate == 19.0
@@ -0,0 +1,54 @@
+"""Test the Smart Thermostat shared outdoor conditions."""
+import pytest
+
+from custom_components.smart_thermostat.outdoor import (
+    OUTDOOR_FUSE,
+    async_get_outdoor_conditions,
+)
+
+WEATHER = "weather.forecast_home"
+PORCH = "sensor.porch_temperature"
+
+
+@pytest.mark.asyncio
+async def test_listeners_hear_only_real_changes(hass):
+    """Test thermostats sharing a weather entity are told about real moves only."""
+    hass.states.async_set(WEATHER, "cloudy", {"temperature": 3.0})
+    first = async_get_outdoor_conditions(hass, WEATHER)
+    assert async_get_outdoor_conditions(hass, WEATHER) is first
+
+    calls = []
+    remove = first.async_add_listener(lambda: calls.append(first.current))
+    assert first.current == 3.0
+
+    hass.states.async_set(WEATHER, "cloudy", {"temperature": 3.2})
+    await hass.async_block_till_done()
+    assert calls == []
+    hass.states.async_set(WEATHER, "rainy", {"temperature": 2.4})
+    await hass.async_block_till_done()
+    assert calls == [2.4]
+
+    remove()
+    hass.states.async_set(WEATHER, "rainy", {"temperature": -5.0})
+    await hass.async_block_till_done()
+    assert calls == [2.4]
+
+
+@pytest.mark.asyncio
+async def test_local_sensors_replace_or_fuse(hass):
+    """Test local outdoor sensors stand in for, or average with, the weather entity."""
+    hass.states.async_set(WEATHER, "sunny", {"temperature": 4.0})
+    hass.states.async_set(PORCH, "1.0")
+
+    replaced = async_get_outdoor_conditions(hass, WEATHER, [PORCH])
+    fused = async_get_outdoor_conditions(hass, WEATHER, [PORCH], OUTDOOR_FUSE)
+    assert replaced is not fused
+    remove = replaced.async_add_listener(lambda: None)
+    assert replaced.current == 1.0
+    assert fused.current == 2.5
+
+    # Without a usable local reading the weather entity takes over again
+    hass.states.async_set(PORCH, "unavailable")
+    await hass.async_block_till_done()
+    assert replaced.current == 4.0
+    remove()
@@ -0,0 +1,58 @@
+"""Test the Smart Thermostat heat source planner."""
+import time
+
+from custom_components.smart_thermostat.planner import HeatSourcePlanner
+
+SETPOINT = 21.0
+
+
+def test_mild_weather_prefers_heat_pump():
+    """Test the heat pump wins while its COP beats the furnace."""
+    planner = HeatSourcePlanner()
+    plan = planner.plan([5.0] * 24, SETPOINT, heat_pump_min_temp=-15)
+    assert plan.source == "heat_pump"
+    assert plan.schedule == "H" * 24
+
+
+def test_cold_weather_prefers_furnace():
+    """Test the furnace wins once the COP has dropped below break-even."""
+    planner = HeatSourcePlanner()
+    plan = planner.plan([-12.0] * 24, SETPOINT, heat_pump_min_temp=-15)
+    assert plan.source == "furnace"
+
+
+def test_plans_around_a_cold_night():
+    """Test the schedule follows the forecast rather than just the current hour."""
+    planner = HeatSourcePlanner()
+    forecast = [4.0] * 6 + [-12.0] * 12 + [4.0] * 6
+    plan = planner.plan(forecast, SETPOINT, heat_pump_min_temp=-15)
+    assert plan.source == "heat_pump"
+    assert plan.schedule == "H" * 6 + "F" * 12 + "H" * 6
+
+
+def test_switch_penalty_avoids_short_excursions():
+    """Test a one-hour dip is not worth two source changes."""
+    planner = HeatSourcePlanner(switch_penalty=1.0)
+    forecast = [4.0] * 10 + [-12.0] + [4.0] * 13
+    plan = planner.plan(forecast, SETPOINT, heat_pump_min_temp=-15)
+    assert plan.schedule == "H" * 24
+
+
+def test_operating_limit():
+    """Test hours below the heat pump's lockout temperature are given to the furnace."""
+    planner = HeatSourcePlanner()
+    assert planner.plan([-20.0] * 24, SETPOINT, heat_pump_min_temp=-15).source == "furnace"
+    plan = planner.plan([4.0, 3.0] * 12, SETPOINT, heat_pump_min_temp=-5)
+    assert plan.schedule == "H" * 24
+
+
+def test_short_forecast_and_speed():
+    """Test partial forecasts are planned and a full plan takes milliseconds."""
+    planner = HeatSourcePlanner()
+    assert len(planner.plan([5.0] * 12, SETPOINT, heat_pump_min_temp=-15).schedule) == 12
+
+    forecast = [4.0 - hour for hour in range(24)]
+    started = time.perf_counter()
+    for _ in range(10):
+        planner.plan(forecast, SETPOINT, heat_pump_min_temp=-15, current_source="furnace")
+    assert (time.perf_counter() - started) / 10 < 0.05
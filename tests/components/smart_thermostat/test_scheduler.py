@@ -0,0 +1,136 @@
+"""Test the Smart Thermostat control scheduler."""
+import asyncio
+from datetime import timedelta
+
+import pytest
+
+from custom_components.smart_thermostat.scheduler import ControlScheduler, PeriodicUpdater
+
+
+class _Control:
+    """Control pass that records concurrency and can be held open."""
+
+    def __init__(self):
+        self.passes = 0
+        self.active = 0
+        self.max_active = 0
+        self.release = asyncio.Event()
+        self.release.set()
+
+    async def __call__(self):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await self.release.wait()
+            self.passes += 1
+        finally:
+            self.active -= 1
+
+
+@pytest.mark.asyncio
+async def test_triggers_during_a_pass_coalesce(hass):
+    """Test triggers arriving mid-pass collapse into one follow-up pass."""
+    control = _Control()
+    scheduler = ControlScheduler(hass, control, debounce=0)
+
+    control.release.clear()
+    first = hass.async_create_task(scheduler.async_run())
+    await asyncio.sleep(0)
+    assert scheduler.running
+
+    # Three more callers while the first pass is held open
+    others = [hass.async_create_task(scheduler.async_run()) for _ in range(3)]
+    await asyncio.sleep(0)
+    control.release.set()
+    await asyncio.gather(first, *others)
+
+    assert control.passes == 2
+    assert control.max_active == 1
+    assert not scheduler.running
+
+
+@pytest.mark.asyncio
+async def test_actions_run_inside_the_next_pass(hass):
+    """Test device work handed to the scheduler waits for a running pass."""
+    control = _Control()
+    scheduler = ControlScheduler(hass, control, debounce=0)
+    seen = []
+
+    async def action():
+        seen.append((control.passes, control.active))
+
+    control.release.clear()
+    first = hass.async_create_task(scheduler.async_run())
+    await asyncio.sleep(0)
+    second = hass.async_create_task(scheduler.async_run(action))
+    await asyncio.sleep(0)
+    assert seen == []
+
+    control.release.set()
+    await asyncio.gather(first, second)
+
+    # Ran after the first pass finished, before the follow-up control
+    assert seen == [(1, 0)]
+    assert control.passes == 2
+
+
+@pytest.mark.asyncio
+async def test_requests_are_debounced(hass):
+    """Test a burst of background requests costs one pass."""
+    control = _Control()
+    scheduler = ControlScheduler(hass, control, debounce=0.05)
+
+    for _ in range(5):
+        scheduler.async_request()
+    await asyncio.sleep(0.1)
+    await hass.async_block_till_done()
+
+    assert control.passes == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_pass_reaches_waiter(hass):
+    """Test an error in a pass is raised to the caller waiting on it."""
+
+    async def control():
+        raise RuntimeError("device unreachable")
+
+    scheduler = ControlScheduler(hass, control, debounce=0)
+    with pytest.raises(RuntimeError):
+        await scheduler.async_run()
+    assert not scheduler.running
+
+
+@pytest.mark.asyncio
+async def test_periodic_updates_run_concurrently_and_skip_overlap(hass):
+    """Test a slow update neither blocks the others nor piles up."""
+    updater = PeriodicUpdater(hass, concurrency=2, tick=timedelta(hours=1))
+    slow = _Control()
+    slow.release.clear()
+    fast = _Control()
+    unsub_slow = updater.async_register("climate.slow", slow, timedelta(seconds=0.01))
+    unsub_fast = updater.async_register("climate.fast", fast, timedelta(seconds=0.01))
+
+    for _ in range(3):
+        await asyncio.sleep(0.02)
+        updater._async_tick()
+        await asyncio.sleep(0)
+    await asyncio.sleep(0)
+
+    assert fast.passes == 3
+    assert slow.active == 1  # Still on its first run; later ticks skipped it
+    slow.release.set()
+    await hass.async_block_till_done()
+    assert slow.passes == 1
+
+    unsub_slow()
+    unsub_fast()
+    assert updater._unsub is None
+
+
+def test_offsets_are_stable_and_spread():
+    """Test each key gets the same offset every time, spread over the interval."""
+    offsets = {PeriodicUpdater.offset(f"climate.zone_{zone}", 120) for zone in range(10)}
+    assert len(offsets) == 10
+    assert all(0 <= offset < 120 for offset in offsets)
+    assert PeriodicUpdater.offset("climate.zone_1", 120) == PeriodicUpdater.offset("climate.zone_1", 120)
@@ -0,0 +1,132 @@
+"""Test the Smart Thermostat sensor aggregation."""
+import pytest
+
+from custom_components.smart_thermostat.sensors import SensorAggregator
+
+SENSORS = ["sensor.bedroom_temperature", "sensor.office_temperature"]
+
+
+def test_readings_follow_updates():
+    """Test the cache keeps the latest reading per sensor and fuses them."""
+    aggregator = SensorAggregator(SENSORS)
+    assert aggregator.temperature is None
+
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    aggregator.update("sensor.office_temperature", 22.0, 1000.0)
+    assert aggregator.temperature == pytest.approx(21.0)
+
+    # Replacing a reading updates the cache in place
+    aggregator.update("sensor.office_temperature", 21.0, 1010.0)
+    assert aggregator.readings == {
+        "sensor.bedroom_temperature": 20.0, "sensor.office_temperature": 21.0
+    }
+    assert len(aggregator) == 2
+
+
+def test_unknown_sensor_ignored():
+    """Test readings from sensors that are not configured are ignored."""
+    aggregator = SensorAggregator(SENSORS)
+    assert aggregator.update("sensor.garage_temperature", 5.0, 1000.0) is False
+    assert aggregator.temperature is None
+
+
+def test_invalid_reading_removes_sensor():
+    """Test an unusable reading drops the sensor from the temperature."""
+    aggregator = SensorAggregator(SENSORS)
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    aggregator.update("sensor.office_temperature", 22.0, 1000.0)
+
+    aggregator.update("sensor.office_temperature", None, 1010.0)
+    assert aggregator.temperature == pytest.approx(20.0)
+    assert "sensor.office_temperature" not in aggregator.readings
+
+
+def test_expire_stale_readings():
+    """Test readings older than the freshness window are dropped."""
+    aggregator = SensorAggregator(SENSORS, freshness=300)
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    aggregator.update("sensor.office_temperature", 22.0, 1200.0)
+
+    assert aggregator.expire(1250.0) == []
+    assert aggregator.expire(1400.0) == ["sensor.bedroom_temperature"]
+    assert aggregator.temperature == pytest.approx(22.0)
+
+
+def test_per_sensor_freshness_deadlines():
+    """Test each sensor gets its own staleness deadline."""
+    aggregator = SensorAggregator(
+        SENSORS, freshness={"sensor.bedroom_temperature": 60}
+    )
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    aggregator.update("sensor.office_temperature", 22.0, 1000.0)
+    assert aggregator.next_deadline() == 1060.0
+
+    # A newer reading supersedes the pending deadline
+    aggregator.update("sensor.bedroom_temperature", 20.5, 1050.0)
+    assert aggregator.next_deadline() == 1110.0
+
+    assert aggregator.expire(1110.0) == ["sensor.bedroom_temperature"]
+    assert aggregator.next_deadline() == 1300.0
+
+
+def test_flagged_sensor_excluded():
+    """Test a stuck sensor stays cached but leaves the fusion."""
+    sensors = SENSORS + ["sensor.hallway_temperature", "sensor.kitchen_temperature"]
+    aggregator = SensorAggregator(sensors)
+    timestamp = 1000.0
+    for step in range(40):
+        temperature = 20.0 + step * 0.05
+        for sensor_id in sensors[1:]:
+            aggregator.update(sensor_id, temperature, timestamp)
+        aggregator.update("sensor.bedroom_temperature", 20.0, timestamp)
+        timestamp += 60
+
+    assert aggregator.flags == {"sensor.bedroom_temperature": "stuck"}
+    assert "sensor.bedroom_temperature" in aggregator.readings
+    assert aggregator.temperature > 21.5
+
+    aggregator.remove("sensor.bedroom_temperature")
+    assert not aggregator.flags
+    assert aggregator.temperature > 21.5
+
+
+def test_silent_stuck_sensor_flagged_after_expiry():
+    """Test a sensor that stops sending events is still judged once it has expired."""
+    sensors = SENSORS + ["sensor.hallway_temperature", "sensor.kitchen_temperature"]
+    aggregator = SensorAggregator(sensors)
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    timestamp = 1000.0
+    for step in range(40):
+        temperature = 20.0 + step * 0.05
+        for sensor_id in sensors[1:]:
+            aggregator.update(sensor_id, temperature, timestamp)
+        aggregator.expire(timestamp)
+        aggregator.refresh(timestamp)
+        if step == 25:
+            # Long gone from the readings, but not flat for long enough yet
+            assert "sensor.bedroom_temperature" not in aggregator.readings
+            assert not aggregator.flags
+        timestamp += 60
+
+    assert aggregator.flags == {"sensor.bedroom_temperature": "stuck"}
+
+    # Coming back on the same value keeps it out; a new value brings it back
+    aggregator.update("sensor.bedroom_temperature", 20.0, timestamp)
+    assert aggregator.flags == {"sensor.bedroom_temperature": "stuck"}
+    assert aggregator.temperature > 21.5
+    aggregator.update("sensor.bedroom_temperature", 22.0, timestamp + 60)
+    assert not aggregator.flags
+
+
+def test_zone_temperature():
+    """Test a zone's temperature only uses its own live sensors."""
+    aggregator = SensorAggregator(SENSORS + ["sensor.basement_temperature"])
+    aggregator.update("sensor.bedroom_temperature", 20.0, 1000.0)
+    aggregator.update("sensor.office_temperature", 22.0, 1000.0)
+    aggregator.update("sensor.basement_temperature", 17.0, 1000.0)
+
+    assert aggregator.zone_temperature(SENSORS) == pytest.approx(21.0)
+    assert aggregator.zone_temperature(["sensor.basement_temperature"]) == pytest.approx(17.0)
+
+    aggregator.update("sensor.basement_temperature", None, 1010.0)
+    assert aggregator.zone_temperature(["sensor.basement_temperature"]) is None
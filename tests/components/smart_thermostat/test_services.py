@@ -0,0 +1,63 @@
+"""Test the Smart Thermostat service router."""
+import asyncio
+
+import pytest
+
+from custom_components.smart_thermostat.const import DOMAIN
+from custom_components.smart_thermostat.services import async_get_router
+
+
+class _Thermostat:
+    """Stand-in thermostat that records calls and can be held open."""
+
+    def __init__(self, entity_id, release):
+        self.entity_id = entity_id
+        self.release = release
+        self.calls = []
+
+    async def async_turn_on(self):
+        await self.release.wait()
+        self.calls.append("turn_on")
+
+    async def async_turn_off(self):
+        self.calls.append("turn_off")
+
+    async def async_force_heat_source(self, source):
+        self.calls.append(("force", source))
+
+
+@pytest.mark.asyncio
+async def test_dispatches_to_every_target_concurrently(hass):
+    """Test one call reaches several zones at once through the index."""
+    router = async_get_router(hass)
+    release = asyncio.Event()
+    zones = [_Thermostat(f"climate.zone_{zone}", release) for zone in range(3)]
+    removers = [router.async_add(zone) for zone in zones]
+
+    call = hass.async_create_task(hass.services.async_call(
+        DOMAIN, "turn_on", {"entity_id": ["climate.zone_0", "climate.zone_2"]}, blocking=True
+    ))
+    await asyncio.sleep(0.01)
+    # Both targets are waiting at the same time rather than one after the other
+    assert not call.done()
+    release.set()
+    await call
+
+    assert zones[0].calls == ["turn_on"]
+    assert zones[1].calls == []
+    assert zones[2].calls == ["turn_on"]
+
+    await hass.services.async_call(
+        DOMAIN, "force_mode", {"entity_id": "all", "force_mode": "furnace"}, blocking=True
+    )
+    assert all(zone.calls[-1] == ("force", "furnace") for zone in zones)
+
+    removers[1]()
+    assert router.get("climate.zone_1") is None
+    with pytest.raises(ValueError):
+        await hass.services.async_call(
+            DOMAIN, "turn_off", {"entity_id": "climate.zone_1"}, blocking=True
+        )
+    for remove in removers:
+        remove()
+    assert len(router) == 0
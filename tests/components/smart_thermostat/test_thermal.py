@@ -0,0 +1,118 @@
+"""Test the Smart Thermostat thermal model."""
+import math
+
+from custom_components.smart_thermostat.thermal import (
+    DEAD_RECKONING_VALIDITY,
+    DeadReckoning,
+    ThermalEstimator,
+    ThermalModel,
+)
+
+HEATING_RATE = 2.0  # °C per hour while burning
+LOSS = 0.05  # Per hour
+OUTDOOR = -5.0
+
+
+def _simulate(estimator, cycles=2, burn=1800, rest=1200, step=120):
+    """Run the house through furnace cycles, feeding a sample every step."""
+    indoor = 19.0
+    timestamp = 0.0
+    for _ in range(cycles):
+        for heating, duration in ((True, burn), (False, rest)):
+            for _ in range(int(duration / step)):
+                estimator.add_sample(timestamp, indoor, OUTDOOR, "furnace", heating)
+                slope = (HEATING_RATE if heating else 0) - LOSS * (indoor - OUTDOOR)
+                indoor += slope * step / 3600
+                timestamp += step
+    return indoor
+
+
+def test_converges_within_two_cycles():
+    """Test the fit recovers the heating rate and loss from two cycles."""
+    estimator = ThermalEstimator()
+    _simulate(estimator)
+
+    model = estimator.models["furnace"]
+    assert model.ready
+    assert math.isclose(model.heating_rate, HEATING_RATE, rel_tol=0.05)
+    assert math.isclose(model.loss, LOSS, rel_tol=0.05)
+
+
+def test_time_to_reach_target():
+    """Test the burn time follows the exponential approach to equilibrium."""
+    model = ThermalModel()
+    model.heating_rate = HEATING_RATE
+    model.loss = LOSS
+
+    seconds = model.time_to_reach(19.0, OUTDOOR, 20.0)
+    equilibrium = HEATING_RATE / LOSS
+    expected = math.log((equilibrium - 24.0) / (equilibrium - 25.0)) / LOSS * 3600
+    assert math.isclose(seconds, expected)
+    assert model.time_to_reach(21.0, OUTDOOR, 20.0) == 0.0
+
+    # The furnace can only hold 40°C above outdoor
+    assert model.time_to_reach(30.0, OUTDOOR, 36.0) is None
+
+
+def test_regime_change_restarts_slope():
+    """Test a slope is never taken across a burner state change."""
+    estimator = ThermalEstimator(sample_interval=60)
+    estimator.add_sample(0, 19.0, OUTDOOR, "furnace", True)
+    assert estimator.add_sample(120, 19.5, OUTDOOR, "furnace", False) is False
+    assert estimator.add_sample(240, 19.4, OUTDOOR, "furnace", False) is True
+    assert estimator.models["furnace"].heating_updates == 0
+
+
+def test_unknown_delivery_skipped():
+    """Test samples are skipped while it isn't known whether heat is delivered."""
+    estimator = ThermalEstimator(sample_interval=60)
+    estimator.add_sample(0, 19.0, OUTDOOR, "heat_pump", True)
+    assert estimator.add_sample(120, 19.2, OUTDOOR, "heat_pump", None) is False
+    assert estimator.add_sample(240, 19.3, OUTDOOR, "heat_pump", None) is False
+    # The next known sample starts a fresh slope instead of spanning the gap
+    assert estimator.add_sample(360, 19.4, OUTDOOR, "heat_pump", True) is False
+    assert estimator.add_sample(480, 19.5, OUTDOOR, "heat_pump", True) is True
+    assert estimator.models["heat_pump"].updates == 1
+
+
+def test_round_trip():
+    """Test a fit survives storage."""
+    estimator = ThermalEstimator()
+    _simulate(estimator)
+
+    restored = ThermalEstimator()
+    restored.load(estimator.as_dict())
+    assert restored.models["furnace"].as_dict() == estimator.models["furnace"].as_dict()
+
+
+def test_dead_reckoning_follows_model_and_expires():
+    """Test an outage is bridged with the thermal model and then given up."""
+    estimator = ThermalEstimator()
+    _simulate(estimator)
+    model = estimator.models["furnace"]
+
+    reckoning = DeadReckoning()
+    reckoning.observe(0.0, 20.0, False)
+    temperature, confidence = reckoning.advance(900.0, model, OUTDOOR, heating=False)
+    expected = OUTDOOR + (20.0 - OUTDOOR) * math.exp(-LOSS * 0.25)
+    assert math.isclose(temperature, expected, abs_tol=0.05)
+    assert confidence == 0.5
+
+    # The burner comes on partway through; the projection turns upwards but
+    # stops at the ceiling
+    warmer, _ = reckoning.advance(1500.0, model, OUTDOOR, heating=True, ceiling=temperature + 0.1)
+    assert warmer == temperature + 0.1
+
+    assert reckoning.advance(DEAD_RECKONING_VALIDITY + 1, model, OUTDOOR) is None
+
+
+def test_dead_reckoning_recent_rate_without_model():
+    """Test the recent slope carries the estimate until the model is ready."""
+    reckoning = DeadReckoning()
+    reckoning.observe(0.0, 20.0, True)
+    reckoning.observe(600.0, 20.5, True)
+    temperature, _ = reckoning.advance(1200.0, None, None, heating=True)
+    assert math.isclose(temperature, 21.0)
+
+    # A slope measured while burning says nothing about the house at rest
+    assert reckoning.advance(1500.0, None, None, heating=False)[0] == temperature
@@ -8,6 +8,7 @@ from homeassistant.setup import async_setup_component
 from homeassistant.helpers import entity_registry as er, storage
 from homeassistant.config_entries import ConfigEntries
 from custom_components.smart_thermostat.climate import DOMAIN, SmartThermostat
+from custom_components.smart_thermostat.scheduler import PeriodicUpdater
 import os
 import asyncio
 from datetime import datetime, timedelta, timezone
@@ -47,6 +48,16 @@ async def mock_hass(hass: HomeAssistant):
         entity_id = call.data.get("entity_id")
         print(f"Entity: {entity_id}")
         
+        # Reflect the command in the device state like a real device would
+        if entity_id and entity_id != "climate.smart_furnace":
+            state = hass.states.get(entity_id)
+            attributes = dict(state.attributes) if state else {}
+            if call.service == "set_hvac_mode":
+                hass.states.async_set(entity_id, call.data["hvac_mode"], attributes)
+            elif call.service == "set_temperature":
+                attributes["temperature"] = call.data["temperature"]
+                hass.states.async_set(entity_id, state.state if state else "off", attributes)
+        
         # Try to find the thermostat
         thermostat = None
         if entity_id:
@@ -219,8 +230,16 @@ async def mock_thermostat(mock_hass, entity_registry):
         {"temperature": 1.7, "temperature_unit": "°C"}
     )
     
-    await mock_hass.async_block_till_done()
-    return thermostat
+    # Subscribe to sensor updates so the reading cache is fed, but keep the
+    # periodic update loop out of the tests; they drive passes themselves.
+    # Saved state stays in memory so one run can't leak into the next.
+    with patch.object(PeriodicUpdater, "async_register", return_value=lambda: None), \
+         patch.object(storage.Store, "async_load", return_value=None), \
+         patch.object(storage.Store, "async_delay_save"):
+        await thermostat.async_added_to_hass()
+    
+        await mock_hass.async_block_till_done()
+        yield thermostat
 
 @pytest.fixture(autouse=True)
 async def reset_thermostat(mock_hass, mock_thermostat):
@@ -241,12 +260,8 @@ async def reset_thermostat(mock_hass, mock_thermostat):
     mock_thermostat._maximum_heating_duration = 0.2
     mock_thermostat._off_time = 0.1
     
-    # Reset last states for heat sources
-    mock_thermostat._heat_pump_last_mode = None
-    mock_thermostat._heat_pump_last_temp = None
-    mock_thermostat._heat_pump_last_fan = None
-    mock_thermostat._furnace_last_mode = None
-    mock_thermostat._furnace_last_temp = None
+    # Reset desired states for heat sources
+    mock_thermostat._reconciler.reset()
     
     # Reset mock states for HVAC entities
     mock_hass.states.async_set(mock_thermostat._hvac_entity, "off")
@@ -839,8 +854,9 @@ async def test_temperature_based_heat_source_switch(mock_hass, mock_thermostat):
     assert mock_thermostat._cycle_status.startswith("heating cycle:"), "Cycle status should be heating cycle"
     
     # Verify furnace is properly configured
-    assert mock_thermostat._furnace_last_mode == "heat", "Furnace should be set to heat mode"
-    assert mock_thermostat._furnace_last_temp == mock_thermostat._max_temp, "Furnace should be set to max temperature"
+    furnace = mock_thermostat._reconciler.desired(mock_thermostat._hvac_entity)
+    assert furnace.hvac_mode == "heat", "Furnace should be set to heat mode"
+    assert furnace.temperature == mock_thermostat._max_temp, "Furnace should be set to max temperature"
 
 @pytest.mark.asyncio
 async def test_turn_on_above_setpoint(mock_hass, mock_thermostat):
@@ -952,4 +968,145 @@ async def test_turn_on_above_setpoint(mock_hass, mock_thermostat):
     print(f"- learning_duration: {mock_thermostat._learning_heating_duration/60:.1f}min")
     
     assert mock_thermostat._is_heating is True
-    assert mock_thermostat._cycle_status.startswith("heating cycle:")
\ No newline at end of file
+    assert mock_thermostat._cycle_status.startswith("heating cycle:")
+
+
+def _reflect_device_commands(hass):
+    """Make climate commands only update the device state, without echoing them into the thermostat."""
+    async def reflect(call):
+        entity_id = call.data["entity_id"]
+        state = hass.states.get(entity_id)
+        attributes = dict(state.attributes) if state else {}
+        if call.service == "set_hvac_mode":
+            hass.states.async_set(entity_id, call.data["hvac_mode"], attributes)
+        else:
+            attributes["temperature"] = call.data["temperature"]
+            hass.states.async_set(entity_id, state.state if state else "off", attributes)
+
+    hass.services.async_register("climate", "set_hvac_mode", reflect)
+    hass.services.async_register("climate", "set_temperature", reflect)
+
+
+@pytest.mark.asyncio
+async def test_heating_cycle_ends_on_deadline(mock_hass, mock_thermostat):
+    """Test the furnace turns off when the heating period ends, without a poll."""
+    # The fixture turns furnace commands back into thermostat mode changes,
+    # which would restart the cycle the deadline just ended
+    _reflect_device_commands(mock_hass)
+    mock_thermostat._learning_heating_duration = 0.2
+    mock_thermostat._off_time = 60
+
+    for sensor in mock_thermostat._temp_sensors:
+        mock_hass.states.async_set(sensor, "19.0", {"unit_of_measurement": "°C"})
+    mock_hass.states.async_set(
+        "weather.forecast_home",
+        "sunny",
+        {"temperature": -2.0, "temperature_unit": "°C"}
+    )
+    await mock_hass.async_block_till_done()
+
+    await mock_thermostat.async_turn_on()
+    await mock_hass.async_block_till_done()
+    assert mock_thermostat._is_heating is True
+    assert mock_thermostat._cycle_timer_unsub is not None
+
+    # Nothing polls the entity; the cycle timer alone ends the heating period
+    await asyncio.sleep(0.3)
+    await mock_hass.async_block_till_done()
+
+    assert mock_thermostat._is_heating is False
+    assert mock_thermostat._cycle_status.startswith("cooling cycle:")
+    assert mock_thermostat._reconciler.desired(mock_thermostat._hvac_entity).hvac_mode == "off"
+    assert mock_hass.states.get(mock_thermostat._hvac_entity).state == "off"
+
+
+@pytest.mark.asyncio
+async def test_restart_resumes_heating_cycle(mock_hass, mock_thermostat):
+    """Test a heating cycle in progress resumes after a restart without new commands."""
+    heating_start = datetime.now() - timedelta(minutes=2)
+    mock_thermostat._system_enabled = True
+    mock_thermostat._hvac_mode = HVACMode.HEAT
+    mock_thermostat._active_heat_source = "furnace"
+    mock_thermostat._is_heating = True
+    mock_thermostat._heating_start_time = heating_start
+    mock_thermostat._learning_heating_duration = 8 * 60
+    stored = mock_thermostat._state_to_store()
+
+    restarted = SmartThermostat(
+        mock_hass, "Smart Furnace", mock_thermostat._temp_sensors,
+        mock_thermostat._hvac_entity, mock_thermostat._heat_pump_entity,
+        19.0, 22.5, 21.5, 0.5, 5 * 60, 15 * 60, 5 * 60, 0, 30,
+        "weather.forecast_home"
+    )
+    restarted.hass = mock_hass
+    restarted.entity_id = "climate.smart_furnace_restarted"
+
+    with patch.object(storage.Store, 'async_load', return_value=stored), \
+         patch.object(restarted._commands, 'async_send') as mock_send:
+        await restarted.async_added_to_hass()
+        await mock_hass.async_block_till_done()
+
+    assert restarted._learning_heating_duration == 8 * 60
+    assert restarted._system_enabled is True
+    assert restarted._is_heating is True
+    assert restarted._heating_start_time == heating_start
+    assert restarted._cycle_deadline == heating_start + timedelta(minutes=8)
+    assert restarted._reconciler.desired(restarted._hvac_entity).hvac_mode == "heat"
+    mock_send.assert_not_called()
+    restarted._async_cancel_cycle_timer()
+
+
+@pytest.mark.asyncio
+async def test_restart_keeps_manual_control(mock_hass, mock_thermostat):
+    """Test a thermostat left enabled but off stays under manual control after a restart."""
+    mock_thermostat._system_enabled = True
+    mock_thermostat._hvac_mode = HVACMode.OFF
+    mock_thermostat._active_heat_source = "furnace"
+    mock_thermostat._cooling_start_time = datetime.now() - timedelta(minutes=2)
+    stored = mock_thermostat._state_to_store()
+
+    restarted = SmartThermostat(
+        mock_hass, "Smart Furnace", mock_thermostat._temp_sensors,
+        mock_thermostat._hvac_entity, mock_thermostat._heat_pump_entity,
+        19.0, 22.5, 21.5, 0.5, 5 * 60, 15 * 60, 5 * 60, 0, 30,
+        "weather.forecast_home"
+    )
+    restarted.hass = mock_hass
+    restarted.entity_id = "climate.smart_furnace_restarted"
+
+    with patch.object(storage.Store, 'async_load', return_value=stored), \
+         patch.object(restarted._commands, 'async_send') as mock_send:
+        await restarted.async_added_to_hass()
+        await mock_hass.async_block_till_done()
+
+    assert restarted._system_enabled is True
+    assert restarted._hvac_mode == HVACMode.OFF
+    assert restarted._cycle_deadline is None
+    assert restarted._reconciler.desired(restarted._hvac_entity).hvac_mode is None
+    mock_send.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_sensor_outage_is_bridged(mock_hass, mock_thermostat):
+    """Test control carries on with an estimate and then holds without crashing."""
+    await mock_thermostat.async_turn_on()
+    await mock_hass.async_block_till_done()
+
+    for sensor in mock_thermostat._temp_sensors:
+        mock_hass.states.async_set(sensor, "unavailable")
+    await mock_hass.async_block_till_done()
+
+    # The last fused temperature is carried forward at less than full confidence
+    assert mock_thermostat.current_temperature == pytest.approx(20.0, abs=0.1)
+    assert mock_thermostat._temperature_confidence < 1.0
+
+    # Once the estimate runs out the heat pump regulates on its own sensor
+    mock_thermostat._dead_reckoning._validity = 0
+    await mock_thermostat.async_update()
+    await mock_hass.async_block_till_done()
+
+    assert mock_thermostat.current_temperature is None
+    assert mock_thermostat._cycle_status == "heatpump holding (no temperature)"
+    assert mock_thermostat._reconciler.desired(
+        mock_thermostat._heat_pump_entity
+    ).temperature == mock_thermostat._target_temperature